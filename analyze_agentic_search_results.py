@@ -5,6 +5,7 @@ Specialized for analyzing agentic search API results with FormattedText structur
 """
 
 import json
+import logging
 import os
 import sys
 import statistics
@@ -13,7 +14,7 @@ import re
 from collections import defaultdict, Counter
 from datetime import datetime
 from typing import Dict, List, Any, Tuple
-from simplified_relevance_scorer import SimplifiedRelevanceScorer
+from simplified_relevance_scorer import SimplifiedRelevanceScorer, score_queries
 
 class AgenticSearchAnalyzer:
     """
@@ -28,8 +29,9 @@ class AgenticSearchAnalyzer:
     5. Description – Result contains key words from description
     """
     
-    def __init__(self):
+    def __init__(self, workers: int = 1):
         self.relevance_scorer = SimplifiedRelevanceScorer()
+        self.workers = workers  # processes used to score the queries (1 = in-process)
         
     def analyze_jsonl_results(self, jsonl_file_path: str) -> Dict[str, Any]:
         """
@@ -217,7 +219,8 @@ class AgenticSearchAnalyzer:
             else:
                 successful_execution_count += 1
         
-        # Process each search result - ONLY successful executions for relevance metrics
+        # Collect each search result - ONLY successful executions for relevance metrics
+        queries = []
         for result in search_results:
             if not result.get('success', False):
                 continue
@@ -228,7 +231,6 @@ class AgenticSearchAnalyzer:
                 
             # Extract test case context
             test_context = result.get('test_case_context', {})
-            question_type = test_context.get('question_type', 'Unknown')
             
             # Extract products from agentic search response
             detailed_results = self._extract_agentic_products(result)
@@ -236,12 +238,13 @@ class AgenticSearchAnalyzer:
                 continue
             
             total_product_items_extracted += len(detailed_results)
-            
-            # Calculate relevance scores using improved scorer
-            relevance_scores = []
-            for product_item in detailed_results:
-                score = self.relevance_scorer.score_result_relevance(product_item, test_context)
-                relevance_scores.append(score)
+            queries.append((test_context, detailed_results))
+        
+        # Score every query's products (across self.workers processes), then reduce the metrics here
+        all_scores = score_queries(queries, 'dataverse', self.workers, self.relevance_scorer)
+        
+        for (test_context, _), relevance_scores in zip(queries, all_scores):
+            question_type = test_context.get('question_type', 'Unknown')
             
             # Count relevant items and exact matches
             relevant_items = [score for score in relevance_scores if score >= 2]  # Score >= 2 is relevant
@@ -880,18 +883,22 @@ class AgenticSearchAnalyzer:
 
 def main():
     """Main function"""
-    if len(sys.argv) != 2:
-        print("Usage: python analyze_agentic_search_results.py <jsonl_file_path>")
+    # Scorer warnings and errors go to stdout alongside the report
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
+    
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python analyze_agentic_search_results.py <jsonl_file_path> [scoring_processes]")
         print("Example: python analyze_agentic_search_results.py test_case_acs_analysis/agentic_results_20250815_025254_results.jsonl")
         sys.exit(1)
     
     jsonl_file = sys.argv[1]
+    workers = int(sys.argv[2]) if len(sys.argv) == 3 else 1
     
     if not os.path.exists(jsonl_file):
         print(f"❌ File not found: {jsonl_file}")
         sys.exit(1)
     
-    analyzer = AgenticSearchAnalyzer()
+    analyzer = AgenticSearchAnalyzer(workers)
     results = analyzer.analyze_jsonl_results(jsonl_file)
     
     if results:
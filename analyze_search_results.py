@@ -5,6 +5,7 @@ Uses improved relevance scoring logic for better evaluation of search engine per
 """
 
 import json
+import logging
 import os
 import sys
 import statistics
@@ -13,7 +14,7 @@ from collections import defaultdict, Counter
 from datetime import datetime
 from typing import Dict, List, Any, Tuple
 from unified_relevance_scorer import UnifiedRelevanceScorer
-from simplified_relevance_scorer import SimplifiedRelevanceScorer
+from simplified_relevance_scorer import SimplifiedRelevanceScorer, score_queries
 
 class EnhancedSearchAnalyzer:
     """
@@ -26,8 +27,9 @@ class EnhancedSearchAnalyzer:
     5. Description – Result is relevant if semantically related to the question
     """
     
-    def __init__(self):
+    def __init__(self, workers: int = 1):
         self.relevance_scorer = SimplifiedRelevanceScorer()
+        self.workers = workers  # processes used to score the queries (1 = in-process)
         
     def analyze_jsonl_results(self, jsonl_file_path: str) -> Dict[str, Any]:
         """
@@ -164,27 +166,30 @@ class EnhancedSearchAnalyzer:
         total_relevant_items = 0
         exact_name_matches = 0
         
-        # Process each search result
+        # Collect each search result's test case context and results
+        queries = []
         for result in search_results:
             if not result.get('success', False):
                 continue
             
             # Extract test case context
             test_context = result.get('test_case_context', {})
-            question_type = test_context.get('question_type', 'Unknown')
             
             # Extract search results
             detailed_results = self._extract_detailed_results(result)
             if not detailed_results:
                 continue
             
-            # Calculate relevance scores using unified scorer (convert 0-3 scale to 0-1 scale)
-            relevance_scores = []
-            for search_item in detailed_results:
-                raw_score = self.relevance_scorer.score_result_relevance(search_item, test_context, 'dataverse')
-                # Convert 0-3 scale to 0-1 scale: 0->0.0, 1->0.33, 2->0.67, 3->1.0
-                normalized_score = raw_score / 3.0 if raw_score > 0 else 0.0
-                relevance_scores.append(normalized_score)
+            queries.append((test_context, detailed_results))
+        
+        # Score every query's results (across self.workers processes), then reduce the metrics here
+        all_raw_scores = score_queries(queries, 'dataverse', self.workers, self.relevance_scorer)
+        
+        for (test_context, _), raw_scores in zip(queries, all_raw_scores):
+            question_type = test_context.get('question_type', 'Unknown')
+            
+            # Convert 0-3 scale to 0-1 scale: 0->0.0, 1->0.33, 2->0.67, 3->1.0
+            relevance_scores = [raw_score / 3.0 if raw_score > 0 else 0.0 for raw_score in raw_scores]
             
             # Count relevant items and exact matches (using normalized scale)
             relevant_items = [score for score in relevance_scores if score >= 0.67]  # Score >= 0.67 (was 2/3) is relevant
@@ -436,17 +441,21 @@ class EnhancedSearchAnalyzer:
 
 def main():
     """Main function"""
-    if len(sys.argv) != 2:
-        print("Usage: python analyze_search_results.py <jsonl_file_path>")
+    # Scorer warnings and errors go to stdout alongside the report
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
+    
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python analyze_search_results.py <jsonl_file_path> [scoring_processes]")
         sys.exit(1)
     
     jsonl_file = sys.argv[1]
+    workers = int(sys.argv[2]) if len(sys.argv) == 3 else 1
     
     if not os.path.exists(jsonl_file):
         print(f"❌ File not found: {jsonl_file}")
         sys.exit(1)
     
-    analyzer = EnhancedSearchAnalyzer()
+    analyzer = EnhancedSearchAnalyzer(workers)
     results = analyzer.analyze_jsonl_results(jsonl_file)
     
     if results:
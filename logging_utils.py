@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Logging helpers shared by the search scripts
+"""
+
+import logging
+import queue
+import sys
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+
+
+@contextmanager
+def queued_stdout_logging(level=logging.INFO):
+    """Log to stdout through a background QueueListener for the duration of the block
+
+    Worker threads only enqueue records, so they never contend for the stdout lock. Meant for
+    a script's entry point; library modules keep bare loggers and leave handlers to the caller.
+    """
+    log_queue = queue.SimpleQueue()
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(logging.Formatter("%(message)s"))
+    listener = QueueListener(log_queue, console_handler)
+    queue_handler = QueueHandler(log_queue)
+
+    root = logging.getLogger()
+    previous_level = root.level
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    listener.start()
+    try:
+        yield
+    finally:
+        # stop() drains every queued record before returning
+        listener.stop()
+        root.removeHandler(queue_handler)
+        root.setLevel(previous_level)
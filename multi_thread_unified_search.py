@@ -5,6 +5,7 @@ Process all questions with threading and save results to unified JSON
 """
 
 import json
+import asyncio
 import requests
 import threading
 import time
@@ -14,6 +15,7 @@ from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone, timedelta
 from collections import Counter
+from functools import lru_cache
 import re
 import shutil
 import psutil
@@ -25,6 +27,11 @@ import signal
 import atexit
 from search_evaluator import SearchEvaluator
 
+try:
+    import aiohttp  # Optional: only required for the --async event-loop runner
+except ImportError:
+    aiohttp = None
+
 # Get Python path from system configuration
 def get_python_path():
     """Dynamically get Python executable path from system"""
@@ -1019,31 +1026,21 @@ class DataverseSearchClient:
         
         return product_info
 
-    def search(self, query_text, skill="Product_azzEXjGzazCl78XgkHBkV", retry_count=1):
-        """Execute search API call with timing and automatic token refresh on auth errors"""
-        
-        # Proactively check and refresh token before making the API call
-        if not self._check_and_refresh_token_if_needed():
-            return {
-                "success": False,
-                # "query": query_text,  # Moved to test_case_context
-                "skill": skill,
-                "timestamp": datetime.now().isoformat(),
-                # "error": "Token refresh failed before API call",  # Not needed in simplified structure
-                # "error_type": "TokenRefreshError",  # Not needed in simplified structure
-                "response_time_seconds": 0,
-                "result_count": 0,
-                "status_code": None,
-                "api_response_products": {
-                    "product_names_found": []
-                    # "products_found": []  # Removed - redundant with product_names_found
-                },
-                "response_data": {"error": "Token refresh failed before API call", "query": None, "queryResult": None, "history": None, "additionalProperties": None},
-                "token_refreshed": False
-                # "requires_manual_token_refresh": True  # Not needed in simplified structure
-            }
+    @staticmethod
+    def _extract_search_results(response_data):
+        """Extract the product list handed to the search evaluator from the response data"""
+        query_result = response_data.get("queryResult") if isinstance(response_data, dict) else None
         
-        payload = {
+        if isinstance(query_result, dict):
+            return query_result.get("products") or []
+        if isinstance(query_result, list):
+            return query_result
+        return []
+
+    @staticmethod
+    def _build_payload(query_text, skill):
+        """Build the queryskillstructureddata request payload"""
+        return {
             "queryText": query_text,
             "skill": skill,
             "options": ["GetResultsSummary"],
@@ -1051,6 +1048,72 @@ class DataverseSearchClient:
                 "ExecuteUnifiedSearch": True
             }
         }
+    
+    def _build_success_result(self, skill, status_code, response_time, response_data, attempt):
+        """Build the result dict for a successfully parsed search response"""
+        # Count results with safe null checking
+        result_count = 0
+        if (response_data and 
+            isinstance(response_data, dict) and
+            'queryResult' in response_data and 
+            response_data['queryResult'] and
+            'result' in response_data['queryResult'] and
+            response_data['queryResult']['result'] is not None):
+            result_list = response_data['queryResult']['result']
+            result_count = len(result_list) if isinstance(result_list, list) else 0
+        
+        # Extract product information
+        product_info = self._extract_product_info(response_data)
+        
+        # Pre-compute evaluator input while the response dict is still hot
+        search_results = self._extract_search_results(response_data)
+        
+        return {
+            "success": True,
+            # "product_names": product_info['product_names'],  # Moved to api_response_products
+            # "product_descriptions": product_info['product_descriptions'],  # Removed - not needed
+            # "products_found": product_info['products_found'],  # Moved to api_response_products
+            # "query": query_text,  # Moved to test_case_context
+            "skill": skill,
+            "timestamp": datetime.now().isoformat(),
+            "status_code": status_code,
+            "response_time_seconds": response_time,
+            "result_count": result_count,
+            "api_response_products": {
+                "product_names_found": product_info['product_names']
+                # "product_descriptions": product_info['product_descriptions'],  # Removed - not needed
+                # "products_found": product_info['products_found']  # Removed - redundant with product_names_found
+            },
+            "response_data": response_data,
+            "search_results": search_results,
+            "token_refreshed": attempt > 0  # Indicates if token was refreshed during this request
+        }
+    
+    @staticmethod
+    def _build_error_result(skill, response_time, status_code, error_message):
+        """Build the result dict for a failed search request"""
+        return {
+            "success": False,
+            "skill": skill,
+            "timestamp": datetime.now().isoformat(),
+            "response_time_seconds": response_time,
+            "result_count": 0,
+            "status_code": status_code,
+            "api_response_products": {
+                "product_names_found": []
+            },
+            "response_data": {"error": error_message, "query": None, "queryResult": None, "history": None, "additionalProperties": None},
+            "token_refreshed": False
+        }
+
+    def search(self, query_text, skill="Product_azzEXjGzazCl78XgkHBkV", retry_count=1):
+        """Execute search API call with timing and automatic token refresh on auth errors"""
+        
+        # Proactively check and refresh token before making the API call
+        if not self._check_and_refresh_token_if_needed():
+            return self._build_error_result(skill, 0, None, "Token refresh failed before API call")
+        
+        payload = self._build_payload(query_text, skill)
         
         start_time = time.time()
         
@@ -1064,100 +1127,16 @@ class DataverseSearchClient:
                 try:
                     response_data = response.json()
                 except json.JSONDecodeError as json_err:
-                    response_time = time.time() - start_time
-                    return {
-                        "success": False,
-                        # "query": query_text,  # Moved to test_case_context
-                        "skill": skill,
-                        "timestamp": datetime.now().isoformat(),
-                        # "error": f"Invalid JSON response: {str(json_err)}",  # Not needed in simplified structure
-                        # "error_type": "JSONDecodeError",  # Not needed in simplified structure
-                        "response_time_seconds": response_time,
-                        "result_count": 0,
-                        "status_code": response.status_code,
-                        "api_response_products": {
-                            "product_names_found": []
-                            # "products_found": []  # Removed - redundant with product_names_found
-                        },
-                        "response_data": {"error": f"Invalid JSON response: {str(json_err)}", "query": None, "queryResult": None, "history": None, "additionalProperties": None},
-                        "token_refreshed": False
-                        # "raw_response_preview": response.text[:500] if response.text else "Empty response"  # Not needed in simplified structure
-                    }
+                    return self._build_error_result(skill, time.time() - start_time, response.status_code,
+                                                    f"Invalid JSON response: {str(json_err)}")
                 
-                # Count results with safe null checking
-                result_count = 0
-                if (response_data and 
-                    isinstance(response_data, dict) and
-                    'queryResult' in response_data and 
-                    response_data['queryResult'] and
-                    'result' in response_data['queryResult'] and
-                    response_data['queryResult']['result'] is not None):
-                    result_list = response_data['queryResult']['result']
-                    result_count = len(result_list) if isinstance(result_list, list) else 0
-                
-                # Extract product information
-                product_info = self._extract_product_info(response_data)
-                
-                return {
-                    "success": True,
-                    # "product_names": product_info['product_names'],  # Moved to api_response_products
-                    # "product_descriptions": product_info['product_descriptions'],  # Removed - not needed
-                    # "products_found": product_info['products_found'],  # Moved to api_response_products
-                    # "query": query_text,  # Moved to test_case_context
-                    "skill": skill,
-                    "timestamp": datetime.now().isoformat(),
-                    "status_code": response.status_code,
-                    "response_time_seconds": response_time,
-                    "result_count": result_count,
-                    "api_response_products": {
-                        "product_names_found": product_info['product_names']
-                        # "product_descriptions": product_info['product_descriptions'],  # Removed - not needed
-                        # "products_found": product_info['products_found']  # Removed - redundant with product_names_found
-                    },
-                    "response_data": response_data,
-                    "token_refreshed": attempt > 0  # Indicates if token was refreshed during this request
-                }
+                return self._build_success_result(skill, response.status_code, response_time, response_data, attempt)
                 
             except requests.exceptions.Timeout as e:
-                response_time = time.time() - start_time
-                return {
-                    "success": False,
-                    # "query": query_text,  # Moved to test_case_context
-                    "skill": skill,
-                    "timestamp": datetime.now().isoformat(),
-                    # "error": f"Request timeout after 60 seconds: {str(e)}",  # Not needed in simplified structure
-                    # "error_type": "TimeoutError",  # Not needed in simplified structure
-                    "response_time_seconds": response_time,
-                    "result_count": 0,
-                    "status_code": None,
-                    "api_response_products": {
-                        "product_names_found": []
-                        # "products_found": []  # Removed - redundant with product_names_found
-                    },
-                    "response_data": {"error": f"Request timeout after 60 seconds: {str(e)}", "query": None, "queryResult": None, "history": None, "additionalProperties": None},
-                    "token_refreshed": False
-                    # "retry_recommended": True  # Not needed in simplified structure
-                }
+                return self._build_error_result(skill, time.time() - start_time, None,
+                                                f"Request timeout after 60 seconds: {str(e)}")
             except requests.exceptions.ConnectionError as e:
-                response_time = time.time() - start_time
-                return {
-                    "success": False,
-                    # "query": query_text,  # Moved to test_case_context
-                    "skill": skill,
-                    "timestamp": datetime.now().isoformat(),
-                    # "error": f"Connection error: {str(e)}",  # Not needed in simplified structure
-                    # "error_type": "ConnectionError",  # Not needed in simplified structure
-                    "response_time_seconds": response_time,
-                    "result_count": 0,
-                    "status_code": None,
-                    "api_response_products": {
-                        "product_names_found": []
-                        # "products_found": []  # Removed - redundant with product_names_found
-                    },
-                    "response_data": {"error": f"Connection error: {str(e)}", "query": None, "queryResult": None, "history": None, "additionalProperties": None},
-                    "token_refreshed": False
-                    # "retry_recommended": True  # Not needed in simplified structure
-                }
+                return self._build_error_result(skill, time.time() - start_time, None, f"Connection error: {str(e)}")
             except requests.exceptions.HTTPError as e:
                 # Check for Gateway Timeout errors (504) - server overload
                 if e.response.status_code == 504 and attempt < retry_count:
@@ -1176,25 +1155,8 @@ class DataverseSearchClient:
                         print("❌ Token is expired. Triggering refresh process...")
                         if not self.refresh_token_if_needed():
                             # Token refresh failed or requires manual intervention
-                            response_time = time.time() - start_time
-                            return {
-                                "success": False,
-                                # "query": query_text,  # Moved to test_case_context
-                                "skill": skill,
-                                "timestamp": datetime.now().isoformat(),
-                                # "error": f"Token expired and refresh failed: {str(e)}",  # Not needed in simplified structure
-                                # "error_type": "TokenExpiredError",  # Not needed in simplified structure
-                                "response_time_seconds": response_time,
-                                "result_count": 0,
-                                "status_code": e.response.status_code,
-                                "api_response_products": {
-                                    "product_names_found": []
-                                    # "products_found": []  # Removed - redundant with product_names_found
-                                },
-                                "response_data": {"error": f"Token expired and refresh failed: {str(e)}", "query": None, "queryResult": None, "history": None, "additionalProperties": None},
-                                "token_refreshed": False
-                                # "requires_manual_token_refresh": True  # Not needed in simplified structure
-                            }
+                            return self._build_error_result(skill, time.time() - start_time, e.response.status_code,
+                                                            f"Token expired and refresh failed: {str(e)}")
                     else:
                         print("⚠️ Token appears valid but authentication failed. This may indicate other auth issues.")
                     
@@ -1203,66 +1165,69 @@ class DataverseSearchClient:
                     continue
                 else:
                     # Non-auth error or max retries reached
+                    return self._build_error_result(skill, time.time() - start_time, e.response.status_code, str(e))
+                    
+            except Exception as e:
+                status_code = getattr(e.response, 'status_code', None) if hasattr(e, 'response') else None
+                return self._build_error_result(skill, time.time() - start_time, status_code, str(e))
+        
+        # This should never be reached, but included for completeness
+        return self._build_error_result(skill, time.time() - start_time, None, "Maximum retry attempts exceeded")
+
+    async def asearch(self, http_session, query_text, skill="Product_azzEXjGzazCl78XgkHBkV", retry_count=1):
+        """Async variant of search() on a shared aiohttp session; backoff uses asyncio.sleep so no thread is pinned"""
+        
+        # Proactively check and refresh token before making the API call; the check can do network
+        # I/O and sleep, so it runs on a worker thread instead of stalling every in-flight request
+        if not await asyncio.to_thread(self._check_and_refresh_token_if_needed):
+            return self._build_error_result(skill, 0, None, "Token refresh failed before API call")
+        
+        payload = self._build_payload(query_text, skill)
+        
+        start_time = time.time()
+        
+        for attempt in range(retry_count + 1):
+            try:
+                async with http_session.post(self.base_url, json=payload, headers=self.headers) as response:
+                    # Gateway Timeout (504) - back off without blocking the event loop
+                    if response.status == 504 and attempt < retry_count:
+                        backoff_delay = (2 ** attempt) * 0.5
+                        print(f"⚠️ Gateway Timeout (504) on attempt {attempt + 1}. Backing off {backoff_delay}s...")
+                        await asyncio.sleep(backoff_delay)
+                        continue
+                    
+                    # Authentication errors (401 Unauthorized, 403 Forbidden)
+                    if response.status in [401, 403] and attempt < retry_count:
+                        print(f"🔄 Authentication error (HTTP {response.status}) on attempt {attempt + 1}. Checking token...")
+                        if not self._is_token_valid() and not await asyncio.to_thread(self.refresh_token_if_needed):
+                            return self._build_error_result(skill, time.time() - start_time, response.status,
+                                                            f"Token expired and refresh failed: HTTP {response.status}")
+                        print(f"🔁 Retrying request (attempt {attempt + 2})...")
+                        continue
+                    
+                    if response.status >= 400:
+                        return self._build_error_result(skill, time.time() - start_time, response.status,
+                                                        f"{response.status} Error: {response.reason} for url: {self.base_url}")
+                    
+                    try:
+                        response_data = await response.json(content_type=None)
+                    except json.JSONDecodeError as json_err:
+                        return self._build_error_result(skill, time.time() - start_time, response.status,
+                                                        f"Invalid JSON response: {str(json_err)}")
+                    
                     response_time = time.time() - start_time
-                    return {
-                        "success": False,
-                        # "query": query_text,  # Moved to test_case_context
-                        "skill": skill,
-                        "timestamp": datetime.now().isoformat(),
-                        # "error": str(e),  # Not needed in simplified structure
-                        # "error_type": "HTTPError",  # Not needed in simplified structure
-                        "response_time_seconds": response_time,
-                        "result_count": 0,
-                        "status_code": e.response.status_code,
-                        "api_response_products": {
-                            "product_names_found": []
-                            # "products_found": []  # Removed - redundant with product_names_found
-                        },
-                        "response_data": {"error": str(e), "query": None, "queryResult": None, "history": None, "additionalProperties": None},
-                        "token_refreshed": False
-                    }
+                    return self._build_success_result(skill, response.status, response_time, response_data, attempt)
                     
+            except asyncio.TimeoutError as e:
+                return self._build_error_result(skill, time.time() - start_time, None,
+                                                f"Request timeout after 60 seconds: {str(e)}")
+            except aiohttp.ClientConnectionError as e:
+                return self._build_error_result(skill, time.time() - start_time, None, f"Connection error: {str(e)}")
             except Exception as e:
-                response_time = time.time() - start_time
-                error_type = type(e).__name__
-                
-                return {
-                    "success": False,
-                    # "query": query_text,  # Moved to test_case_context
-                    "skill": skill,
-                    "timestamp": datetime.now().isoformat(),
-                    # "error": str(e),  # Not needed in simplified structure
-                    # "error_type": error_type,  # Not needed in simplified structure
-                    "response_time_seconds": response_time,
-                    "result_count": 0,
-                    "status_code": getattr(e.response, 'status_code', None) if hasattr(e, 'response') else None,
-                    "api_response_products": {
-                        "product_names_found": []
-                        # "products_found": []  # Removed - redundant with product_names_found
-                    },
-                    "response_data": {"error": str(e), "query": None, "queryResult": None, "history": None, "additionalProperties": None},
-                    "token_refreshed": False
-                }
+                return self._build_error_result(skill, time.time() - start_time, None, str(e))
         
         # This should never be reached, but included for completeness
-        response_time = time.time() - start_time
-        return {
-            "success": False,
-            # "query": query_text,  # Moved to test_case_context
-            "skill": skill,
-            "timestamp": datetime.now().isoformat(),
-            # "error": "Maximum retry attempts exceeded",  # Not needed in simplified structure
-            # "error_type": "MaxRetriesExceededError",  # Not needed in simplified structure
-            "response_time_seconds": response_time,
-            "result_count": 0,
-            "status_code": None,
-            "api_response_products": {
-                "product_names_found": []
-                # "products_found": []  # Removed - redundant with product_names_found
-            },
-            "response_data": {"error": "Maximum retry attempts exceeded", "query": None, "queryResult": None, "history": None, "additionalProperties": None},
-            "token_refreshed": False
-        }
+        return self._build_error_result(skill, time.time() - start_time, None, "Maximum retry attempts exceeded")
 
 class QuestionExtractor:
     """Extract questions from various file types"""
@@ -1282,7 +1247,19 @@ class QuestionExtractor:
     
     @staticmethod
     def extract_questions_from_file(file_path):
-        """Extract questions from a single file with original product context"""
+        """Extract questions from a single file with original product context (memoized on path + mtime)"""
+        file_path = Path(file_path)
+        try:
+            mtime = file_path.stat().st_mtime_ns
+        except OSError as e:
+            print(f"❌ Error processing {file_path}: {e}")
+            return []
+        # Cached lists are shared between callers and must be treated as read-only
+        return _extract_questions_cached(str(file_path), mtime)
+    
+    @staticmethod
+    def _extract_questions_uncached(file_path):
+        """Parse a question file from disk"""
         questions = []
         
         try:
@@ -1402,97 +1379,77 @@ class QuestionExtractor:
             print(f"❌ Error processing {file_path}: {e}")
             return []
 
-def process_single_question(client, question_data, progress_tracker, delay=0, max_retries=2, evaluator=None):
-    """Process a single question with detailed progress tracking and real-time file output"""
-    # Check for shutdown request before processing
-    if shutdown_requested:
-        return {
-            "success": False,
-            # "query": question_data.get("question", "Unknown"),  # Moved to test_case_context
-            # "error": "Processing interrupted by user",  # Not needed in simplified structure
-            # "error_type": "UserInterruption",  # Not needed in simplified structure
-            "skill": "Product_azzEXjGzazCl78XgkHBkV",  # Default skill
-            "timestamp": datetime.now().isoformat(),
-            "response_time_seconds": 0,
-            "result_count": 0,
-            "status_code": None,
-            "test_case_context": {
-                "original_product_name": question_data.get("original_product_name", ""),
-                "original_product_description": question_data.get("original_product_description", ""),
-                "original_product_price": question_data.get("original_product_price", 0.0),
-                "original_product_attributes": question_data.get("original_product_attributes", []),
-                "original_product_category": question_data.get("original_product_category", ""),
-                "question": question_data.get("question", "Unknown"),
-                "question_type": question_data.get("question_type", "")
-            },
-            "api_response_products": {
-                "product_names_found": []
-                # "products_found": []  # Removed - redundant with product_names_found
-            },
-            "response_data": {"error": "Processing interrupted by user", "query": None, "queryResult": None, "history": None, "additionalProperties": None},
-            "token_refreshed": False
-        }
-    
-    # No delay between threads for maximum throughput
-    # All threads run in parallel without any artificial delays
-    
-    # Retry mechanism for failed requests
-    last_result = None
-    for retry_attempt in range(max_retries + 1):
-        # Check for shutdown request during retries
-        if shutdown_requested:
-            break
-            
-        if retry_attempt > 0:
-            # Exponential backoff for retries only
-            retry_delay = 0.1 * (2 ** retry_attempt)  # Start with 0.1s, then 0.2s, 0.4s
-            print(f"🔄 Retrying question (attempt {retry_attempt + 1}/{max_retries + 1}) after {retry_delay}s delay")
-            time.sleep(retry_delay)
-        
-        result = client.search(question_data["question"], retry_count=1)
-        
-        # Enhance result with original product information from test case
-        # Reorganize the result to move test_case_context before api_response_products
-        enhanced_result = {
-            "success": result.get("success", False),
-            "skill": result.get("skill", ""),
-            "timestamp": result.get("timestamp", ""),
-            "status_code": result.get("status_code"),
-            "response_time_seconds": result.get("response_time_seconds", 0),
-            "result_count": result.get("result_count", 0),
-            "test_case_context": {
-                "original_product_name": question_data.get("original_product_name", ""),
-                "original_product_description": question_data.get("original_product_description", ""),
-                "original_product_price": question_data.get("original_product_price", 0.0),
-                "original_product_attributes": question_data.get("original_product_attributes", []),
-                "original_product_category": question_data.get("original_product_category", ""),
-                "question": question_data.get("question", ""),
-                "question_type": question_data.get("question_type", "")
-            },
-            "api_response_products": result.get("api_response_products", {
-                "product_names_found": []
-                # "products_found": []  # Removed - redundant with product_names_found
-            }),
-            "response_data": result.get("response_data", {}),
-            "token_refreshed": result.get("token_refreshed", False)
-        }
-        
-        # Replace the original result with enhanced result
-        result = enhanced_result
-        
-        # Check if retry is needed based on error type
-        should_retry = (
-            not result.get("success", False) and 
-            retry_attempt < max_retries and
-            result.get("error_type") in ["TimeoutError", "ConnectionError", "JSONDecodeError"] and
-            not shutdown_requested  # Don't retry if shutdown requested
-        )
-        
-        if not should_retry:
-            break
-            
-        last_result = result
-    
+@lru_cache(maxsize=None)
+def _extract_questions_cached(path_str, mtime):
+    """Parse each (file, mtime) pair once; a modified file gets a new cache key"""
+    return QuestionExtractor._extract_questions_uncached(Path(path_str))
+
+def _build_enhanced_result(result, question_data):
+    """Reorganize a client result so test_case_context comes before api_response_products"""
+    return {
+        "success": result.get("success", False),
+        "skill": result.get("skill", ""),
+        "timestamp": result.get("timestamp", ""),
+        "status_code": result.get("status_code"),
+        "response_time_seconds": result.get("response_time_seconds", 0),
+        "result_count": result.get("result_count", 0),
+        "test_case_context": {
+            "original_product_name": question_data.get("original_product_name", ""),
+            "original_product_description": question_data.get("original_product_description", ""),
+            "original_product_price": question_data.get("original_product_price", 0.0),
+            "original_product_attributes": question_data.get("original_product_attributes", []),
+            "original_product_category": question_data.get("original_product_category", ""),
+            "question": question_data.get("question", ""),
+            "question_type": question_data.get("question_type", "")
+        },
+        "api_response_products": result.get("api_response_products", {
+            "product_names_found": []
+            # "products_found": []  # Removed - redundant with product_names_found
+        }),
+        "response_data": result.get("response_data", {}),
+        "token_refreshed": result.get("token_refreshed", False)
+    }
+
+def _build_interrupted_result(question_data):
+    """Result recorded for a question skipped because shutdown was requested"""
+    return {
+        "success": False,
+        # "query": question_data.get("question", "Unknown"),  # Moved to test_case_context
+        # "error": "Processing interrupted by user",  # Not needed in simplified structure
+        # "error_type": "UserInterruption",  # Not needed in simplified structure
+        "skill": "Product_azzEXjGzazCl78XgkHBkV",  # Default skill
+        "timestamp": datetime.now().isoformat(),
+        "response_time_seconds": 0,
+        "result_count": 0,
+        "status_code": None,
+        "test_case_context": {
+            "original_product_name": question_data.get("original_product_name", ""),
+            "original_product_description": question_data.get("original_product_description", ""),
+            "original_product_price": question_data.get("original_product_price", 0.0),
+            "original_product_attributes": question_data.get("original_product_attributes", []),
+            "original_product_category": question_data.get("original_product_category", ""),
+            "question": question_data.get("question", "Unknown"),
+            "question_type": question_data.get("question_type", "")
+        },
+        "api_response_products": {
+            "product_names_found": []
+            # "products_found": []  # Removed - redundant with product_names_found
+        },
+        "response_data": {"error": "Processing interrupted by user", "query": None, "queryResult": None, "history": None, "additionalProperties": None},
+        "token_refreshed": False
+    }
+
+def _should_retry_question(result, retry_attempt, max_retries):
+    """Check if retry is needed based on error type"""
+    return (
+        not result.get("success", False) and 
+        retry_attempt < max_retries and
+        result.get("error_type") in ["TimeoutError", "ConnectionError", "JSONDecodeError"] and
+        not shutdown_requested  # Don't retry if shutdown requested
+    )
+
+def _record_question_result(result, question_data, search_results, progress_tracker, evaluator=None):
+    """Feed the evaluator and progress tracker, then append the result to the output file"""
     # Extract detailed metrics for tracking
     success = result["success"]
     status_code = result.get("status_code")
@@ -1503,16 +1460,7 @@ def process_single_question(client, question_data, progress_tracker, delay=0, ma
     # Add to search evaluator if provided
     if evaluator and success:
         try:
-            # Extract search results from the API response
-            search_results = []
-            api_response = result.get("response_data", {})
-            query_result = api_response.get("queryResult", {})
-            
-            if isinstance(query_result, dict) and "products" in query_result:
-                search_results = query_result["products"]
-            elif isinstance(query_result, list):
-                search_results = query_result
-            
+            # Search results were already extracted by client.search at response-parse time
             # Add to evaluator with response time in milliseconds
             evaluator.add_search_result(
                 question_data=question_data,
@@ -1534,13 +1482,100 @@ def process_single_question(client, question_data, progress_tracker, delay=0, ma
     
     # Immediately append result to file
     progress_tracker.append_result(result)
+
+def process_single_question(client, question_data, progress_tracker, delay=0, max_retries=2, evaluator=None):
+    """Process a single question with detailed progress tracking and real-time file output"""
+    # Check for shutdown request before processing
+    if shutdown_requested:
+        return _build_interrupted_result(question_data)
+    
+    # No delay between threads for maximum throughput
+    # All threads run in parallel without any artificial delays
+    
+    # Retry mechanism for failed requests
+    for retry_attempt in range(max_retries + 1):
+        # Check for shutdown request during retries
+        if shutdown_requested:
+            break
+            
+        if retry_attempt > 0:
+            # Exponential backoff for retries only
+            retry_delay = 0.1 * (2 ** retry_attempt)  # Start with 0.1s, then 0.2s, 0.4s
+            print(f"🔄 Retrying question (attempt {retry_attempt + 1}/{max_retries + 1}) after {retry_delay}s delay")
+            time.sleep(retry_delay)
+        
+        result = client.search(question_data["question"], retry_count=1)
+        search_results = result.get("search_results", [])
+        
+        # Replace the original result with enhanced result
+        result = _build_enhanced_result(result, question_data)
+        
+        if not _should_retry_question(result, retry_attempt, max_retries):
+            break
+    
+    _record_question_result(result, question_data, search_results, progress_tracker, evaluator)
+    
+    return result
+
+async def aprocess_single_question(client, http_session, question_data, progress_tracker, max_retries=2, evaluator=None):
+    """Event-loop variant of process_single_question; retry backoff awaits instead of sleeping a thread"""
+    if shutdown_requested:
+        return _build_interrupted_result(question_data)
+    
+    for retry_attempt in range(max_retries + 1):
+        if shutdown_requested:
+            break
+            
+        if retry_attempt > 0:
+            retry_delay = 0.1 * (2 ** retry_attempt)
+            print(f"🔄 Retrying question (attempt {retry_attempt + 1}/{max_retries + 1}) after {retry_delay}s delay")
+            await asyncio.sleep(retry_delay)
+        
+        result = await client.asearch(http_session, question_data["question"], retry_count=1)
+        search_results = result.get("search_results", [])
+        
+        result = _build_enhanced_result(result, question_data)
+        
+        if not _should_retry_question(result, retry_attempt, max_retries):
+            break
+    
+    _record_question_result(result, question_data, search_results, progress_tracker, evaluator)
     
     return result
 
+async def run_questions_async(client, all_questions, progress_tracker, workers, evaluator=None):
+    """Process every question on a single event loop, capping in-flight requests with a semaphore"""
+    semaphore = asyncio.Semaphore(workers)
+    total = len(all_questions)
+    completed = 0
+    
+    connector = aiohttp.TCPConnector(limit=workers)
+    timeout = aiohttp.ClientTimeout(total=60)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as http_session:
+        async def process_q(question_data):
+            async with semaphore:
+                return await aprocess_single_question(client, http_session, question_data, progress_tracker, 2, evaluator)
+        
+        for next_done in asyncio.as_completed([process_q(q) for q in all_questions]):
+            if shutdown_requested:
+                print("🛑 Shutdown requested. Cancelling remaining tasks...")
+                break
+            try:
+                await next_done
+            except Exception as e:
+                print(f"❌ Task failed: {e}")
+            completed += 1
+            
+            # Print progress updates
+            if completed % 50 == 0 or completed == total:
+                print(f"📊 Completed: {completed}/{total}, Remaining: {total - completed}")
+    
+    return completed
+
 def main():
     """Main execution function with intelligent hardware-based configuration"""
     import argparse
-    global global_progress_tracker
+    global global_progress_tracker, shutdown_requested
     
     # Register signal handlers for graceful shutdown
     register_signal_handlers()
@@ -1560,6 +1595,7 @@ def main():
     parser.add_argument('--path', '-p', default='.', help='Base path to search for files')
     parser.add_argument('--auto', '-a', action='store_true', default=True, help='Use automatic hardware-based configuration (default)')
     parser.add_argument('--manual', '-m', action='store_true', help='Use manual configuration (disable auto-detection)')
+    parser.add_argument('--async', dest='use_async', action='store_true', help='Run all requests on one asyncio event loop (requires aiohttp)')
     
     args = parser.parse_args()
     
@@ -1666,52 +1702,60 @@ def main():
     total_futures = len(all_questions)
     
     try:
-        with ThreadPoolExecutor(max_workers=workers) as executor:
-            futures = [
-                executor.submit(process_single_question, client, q, progress_tracker, delay, 2, search_evaluator)
-                for q in all_questions
-            ]
-            
-            # Process completed futures and handle shutdown gracefully
-            import concurrent.futures
-            
-            while futures and not shutdown_requested:
-                try:
-                    # Use timeout to make it interruptible
-                    for future in concurrent.futures.as_completed(futures, timeout=0.5):
-                        futures.remove(future)
-                        try:
-                            future.result()
-                            completed_futures += 1
-                        except Exception as e:
-                            print(f"❌ Task failed: {e}")
-                            completed_futures += 1
+        if args.use_async:
+            if aiohttp is None:
+                raise RuntimeError("--async requires aiohttp (pip install aiohttp)")
+            print(f"⚡ Async mode: up to {workers} concurrent requests on a single event loop")
+            completed_futures = asyncio.run(
+                run_questions_async(client, all_questions, progress_tracker, workers, search_evaluator)
+            )
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(process_single_question, client, q, progress_tracker, delay, 2, search_evaluator)
+                    for q in all_questions
+                ]
+            
+                # Process completed futures and handle shutdown gracefully
+                import concurrent.futures
+            
+                while futures and not shutdown_requested:
+                    try:
+                        # Use timeout to make it interruptible
+                        for future in concurrent.futures.as_completed(futures, timeout=0.5):
+                            futures.remove(future)
+                            try:
+                                future.result()
+                                completed_futures += 1
+                            except Exception as e:
+                                print(f"❌ Task failed: {e}")
+                                completed_futures += 1
                         
-                        # Check for shutdown after each completed task
-                        if shutdown_requested:
-                            break
+                            # Check for shutdown after each completed task
+                            if shutdown_requested:
+                                break
                             
-                        # Print progress updates
-                        if completed_futures % 50 == 0 or completed_futures == total_futures:
-                            remaining = total_futures - completed_futures
-                            print(f"📊 Completed: {completed_futures}/{total_futures}, Remaining: {remaining}")
+                            # Print progress updates
+                            if completed_futures % 50 == 0 or completed_futures == total_futures:
+                                remaining = total_futures - completed_futures
+                                print(f"📊 Completed: {completed_futures}/{total_futures}, Remaining: {remaining}")
                 
-                except concurrent.futures.TimeoutError:
-                    # Timeout is expected, just continue and check shutdown flag
-                    continue
-                except KeyboardInterrupt:
-                    print("\n🛑 KeyboardInterrupt caught in main loop - delegating to signal handler!")
-                    # Don't handle here - let the signal handler manage it
-                    # Just break the loop and let shutdown_requested handle cleanup
-                    break
-            
-            # Handle shutdown: cancel remaining futures if shutdown was requested
-            if shutdown_requested and futures:
-                print("🛑 Shutdown requested. Cancelling remaining tasks...")
-                for remaining_future in futures:
-                    if not remaining_future.done():
-                        remaining_future.cancel()
-                print(f"✅ Cancelled {len(futures)} remaining tasks")
+                    except concurrent.futures.TimeoutError:
+                        # Timeout is expected, just continue and check shutdown flag
+                        continue
+                    except KeyboardInterrupt:
+                        print("\n🛑 KeyboardInterrupt caught in main loop - delegating to signal handler!")
+                        # Don't handle here - let the signal handler manage it
+                        # Just break the loop and let shutdown_requested handle cleanup
+                        break
+            
+                # Handle shutdown: cancel remaining futures if shutdown was requested
+                if shutdown_requested and futures:
+                    print("🛑 Shutdown requested. Cancelling remaining tasks...")
+                    for remaining_future in futures:
+                        if not remaining_future.done():
+                            remaining_future.cancel()
+                    print(f"✅ Cancelled {len(futures)} remaining tasks")
                     
     except KeyboardInterrupt:
         print("\n🛑 KeyboardInterrupt caught in outer handler - delegating to signal handler!")
@@ -4,26 +4,100 @@ Multi-threaded Unstructured Dataverse Search
 Process search queries using QueryTextContext endpoint with threading
 """
 
+import asyncio
 import json
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.util.request import ACCEPT_ENCODING
 import threading
 import time
 import sys
 import os
+import base64
+import gzip
+import logging
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from datetime import datetime, timezone, timedelta
+from logging_utils import queued_stdout_logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
+from datetime import datetime
 from collections import Counter
 import re
+import operator
+import shutil
+import multiprocessing
+
+try:
+    import orjson  # C-accelerated JSON; falls back to the stdlib json module when missing
+except ImportError:
+    orjson = None
+
+try:
+    import ijson  # Streaming parser for large test_case files; optional
+except ImportError:
+    ijson = None
+
+try:
+    import httpx  # Optional: only required for the --async HTTP/2 runner (pip install "httpx[http2]")
+    import h2  # noqa: F401 - httpx needs it for http2=True
+except ImportError:
+    httpx = None
+
+# Per-query and progress messages; main() (or a shard worker) routes them to stdout through
+# logging_utils.queued_stdout_logging, so worker threads never block on the console
+logger = logging.getLogger(__name__)
+
+def _dumps_bytes(obj):
+    """Serialize obj to compact UTF-8 JSON bytes"""
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def _dumps_line(record):
+    """Serialize one record as a UTF-8 NDJSON line"""
+    return _dumps_bytes(record) + b"\n"
+
+# Placeholder swapped for the JSON-encoded search text in the pre-serialized payload
+_SEARCH_TEXT_PLACEHOLDER = "__SEARCH_TEXT__"
+
+# Transient statuses retried in place, matching the sync session's urllib3 Retry policy
+_RETRY_STATUSES = (429, 500, 502, 503, 504)
+_MAX_RETRIES = 5
 
 class UnstructuredSearchRunner:
-    def __init__(self, max_workers=10):
+    def __init__(self, max_workers=10, stream_file=None, keep_response_data=False, compress_requests=False, batch_size=1):
         self.max_workers = max_workers
-        self.session = requests.Session()
+        # gzip request bodies (compresslevel=1); only enable against servers that accept Content-Encoding
+        self.compress_requests = compress_requests
+        # batch_size > 1 sends several queries per request as searchTexts; if the endpoint
+        # rejects that shape (HTTP 400) the runner falls back to one query per request
+        self.batch_size = max(1, batch_size)
+        self._batch_supported = True
+        # Downstream reporting only needs result_count and success; the full 100-result
+        # response body is only kept in each record when explicitly requested
+        self.keep_response_data = keep_response_data
+        # When stream_file is set, completed results are appended to it as NDJSON
+        # and only the counters below are kept in memory
+        self.stream_file = stream_file
+        self._stream_fp = None
+        self.completed_count = 0
+        self.successful_count = 0
+        # Each worker thread lazily gets its own Session (see _get_session), so the urllib3
+        # pool lock is never contended across threads
+        self._tls = threading.local()
+        # Headers last handed to the async client (see _async_headers)
+        self._async_headers_src = None
+        self._async_headers_dict = None
+        
         self.token = self._read_token()
+        # Token expiry (JWT exp claim) drives reloading token.config before in-flight requests start to 401
+        self._token_lock = threading.Lock()
+        self._token_exp = self._jwt_exp(self.token)
+        self._token_next_check = 0.0
         self.endpoint = "https://aurorabapenv87b96.crm10.dynamics.com/api/copilot/v1.0/QueryTextContext"
+        self._payload_template = self._create_payload_template()
         self.results = []
-        self.lock = threading.Lock()
         
         # Set up headers
         self.headers = {
@@ -34,25 +108,118 @@ class UnstructuredSearchRunner:
             "x-ms-crm-userid": "aurorauser01@aurorafinanceintegration02.onmicrosoft.com",
             "x-ms-organization-id": "440a70c9-ff61-f011-beb8-6045bd09e9cc",
             "x-ms-user-agent": "PowerVA/2",
-            "Authorization": f"Bearer {self.token}"
+            "Authorization": f"Bearer {self.token}",
+            # Every encoding urllib3 can decode here (gzip/deflate, plus br/zstd when
+            # brotli/zstandard are installed) - the JSON responses compress several-fold
+            "Accept-Encoding": ACCEPT_ENCODING
         }
+        if self.compress_requests:
+            self.headers["Content-Encoding"] = "gzip"
     
     def _read_token(self):
         """Read token from token.config file"""
         try:
             with open("token.config", "r") as f:
-                return f.read().strip()
+                token = f.read().strip()
         except FileNotFoundError:
             print("ERROR: token.config file not found")
             sys.exit(1)
         except Exception as e:
             print(f"ERROR reading token: {e}")
             sys.exit(1)
+        
+        # Fail fast on an empty or malformed token instead of on the first 401
+        if token.count(".") != 2:
+            print("ERROR: token.config does not contain a JWT bearer token")
+            sys.exit(1)
+        return token
+    
+    def _get_session(self):
+        """Return this thread's requests.Session, creating it on first use and keeping its headers current"""
+        session = getattr(self._tls, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update({"Connection": "keep-alive"})
+            # One keep-alive connection per thread is all a worker needs. Transient 429/5xx
+            # responses are retried in place (POST included, honoring Retry-After) instead of
+            # being recorded as failures that force a rerun of the batch.
+            adapter = HTTPAdapter(
+                pool_connections=2,
+                pool_maxsize=2,
+                max_retries=Retry(
+                    total=_MAX_RETRIES,
+                    backoff_factor=0.5,
+                    status_forcelist=_RETRY_STATUSES,
+                    allowed_methods=frozenset(["POST"]),
+                    respect_retry_after_header=True,
+                    raise_on_status=False
+                )
+            )
+            session.mount("https://", adapter)
+            self._tls.session = session
+        
+        # Headers live on the session so requests does not merge a per-call headers dict;
+        # a token reload swaps in a new dict, so an identity check is enough to spot it
+        headers = self._current_headers()
+        if getattr(self._tls, "headers", None) is not headers:
+            session.headers.update(headers)
+            self._tls.headers = headers
+        return session
+    
+    @staticmethod
+    def _retry_after_seconds(response, default=1):
+        """Seconds requested by a Retry-After header (delta-seconds form), or the default"""
+        try:
+            return max(0, int(response.headers.get("Retry-After", default)))
+        except (TypeError, ValueError):
+            return default
     
-    def _create_search_payload(self, search_text):
-        """Create the search payload for QueryTextContext endpoint"""
+    @staticmethod
+    def _jwt_exp(token):
+        """Return the exp claim of a JWT access token, or None if it cannot be decoded"""
+        try:
+            payload = token.split(".")[1]
+            payload += "=" * (-len(payload) % 4)
+            claims = base64.urlsafe_b64decode(payload)
+            return (orjson.loads(claims) if orjson else json.loads(claims)).get("exp")
+        except Exception:
+            return None
+    
+    def _current_headers(self):
+        """Return request headers, reloading token.config when the token is within 60s of expiry"""
+        now = time.time()
+        if self._token_exp is None or now < self._token_exp - 60 or now < self._token_next_check:
+            return self.headers
+        
+        with self._token_lock:
+            # Another worker may have refreshed the token while we waited for the lock
+            if now < self._token_exp - 60 or now < self._token_next_check:
+                return self.headers
+            
+            try:
+                with open("token.config", "r") as f:
+                    token = f.read().strip()
+            except Exception as e:
+                logger.info(f"⚠️ Could not reload token.config: {e}")
+                token = self.token
+            
+            token_exp = self._jwt_exp(token)
+            if token != self.token and token_exp:
+                # Swap in a new dict so threads reading the old one are never affected
+                self.headers = {**self.headers, "Authorization": f"Bearer {token}"}
+                self.token = token
+                self._token_exp = token_exp
+                logger.info("🔄 Reloaded bearer token from token.config")
+            else:
+                # token.config has not been updated yet; check again shortly instead of on every request
+                self._token_next_check = now + 5
+            
+            return self.headers
+    
+    @staticmethod
+    def _base_payload():
+        """QueryTextContext payload fields shared by every request (everything except the search text)"""
         return {
-            "searchText": search_text,
             "entityParameters": [
                 {
                     "name": "cr4a3_product",
@@ -68,128 +235,398 @@ class UnstructuredSearchRunner:
             }
         }
     
+    @classmethod
+    def _create_payload_template(cls):
+        """Pre-serialize the QueryTextContext payload; only searchText varies per request"""
+        return _dumps_bytes({"searchText": _SEARCH_TEXT_PLACEHOLDER, **cls._base_payload()})
+    
+    def _create_search_body(self, search_text):
+        """Create the JSON request body for QueryTextContext endpoint"""
+        body = self._payload_template.replace(
+            _dumps_bytes(_SEARCH_TEXT_PLACEHOLDER), _dumps_bytes(search_text), 1
+        )
+        if self.compress_requests:
+            body = gzip.compress(body, compresslevel=1)
+        return body
+    
+    def _response_result(self, query_id, search_text, duration, status_code, content):
+        """Build the result record for a completed HTTP response"""
+        result = {
+            "query_id": query_id or len(self.results) + 1,
+            "search_text": search_text,
+            "duration_seconds": round(duration, 2),
+            "ts_ms": int(time.time() * 1000),
+            "status_code": status_code,
+            "success": status_code == 200
+        }
+        
+        if status_code == 200:
+            try:
+                response_data = orjson.loads(content) if orjson else json.loads(content)
+                if self.keep_response_data:
+                    result["response_data"] = response_data
+                result["result_count"] = len(response_data.get("value", []))
+                logger.info(f"✓ Query {query_id}: '{search_text[:50]}...' - {result['result_count']} results ({duration:.2f}s)")
+            except json.JSONDecodeError as e:
+                result["error"] = f"JSON decode error: {str(e)}"
+                result["raw_response"] = content.decode("utf-8", errors="replace")
+                logger.info(f"✗ Query {query_id}: JSON decode error")
+        else:
+            result["error"] = f"HTTP {status_code}: {content.decode('utf-8', errors='replace')}"
+            logger.info(f"✗ Query {query_id}: HTTP {status_code}")
+        
+        return result
+    
+    def _request_error_result(self, query_id, search_text, duration, error):
+        """Build the result record for a request that never got a response"""
+        logger.info(f"✗ Query {query_id}: Request error - {str(error)}")
+        return {
+            "query_id": query_id or len(self.results) + 1,
+            "search_text": search_text,
+            "duration_seconds": round(duration, 2),
+            "ts_ms": int(time.time() * 1000),
+            "success": False,
+            "error": f"Request error: {str(error)}"
+        }
+    
     def search_single_query(self, search_text, query_id=None):
         """Perform a single search query"""
+        session = self._get_session()
         start_time = time.time()
         try:
-            payload = self._create_search_payload(search_text)
+            body = self._create_search_body(search_text)
             
-            response = self.session.post(
+            response = session.post(
                 self.endpoint,
-                headers=self.headers,
-                json=payload,
+                data=body,
                 timeout=30
             )
-            
-            end_time = time.time()
-            duration = end_time - start_time
-            
+        except requests.exceptions.RequestException as e:
+            return self._request_error_result(query_id, search_text, time.time() - start_time, e)
+        
+        result = self._response_result(query_id, search_text, time.time() - start_time, response.status_code, response.content)
+        if response.status_code == 429:
+            # Still throttled after retries: hold this worker so queued queries back off too
+            time.sleep(self._retry_after_seconds(response))
+        return result
+    
+    def _async_headers(self):
+        """Current request headers for the httpx client, leaving Accept-Encoding to httpx's own decoders"""
+        headers = self._current_headers()
+        if self._async_headers_src is not headers:
+            self._async_headers_dict = {k: v for k, v in headers.items() if k != "Accept-Encoding"}
+            self._async_headers_src = headers
+        return self._async_headers_dict
+    
+    async def asearch_single_query(self, client, search_text, query_id=None):
+        """Async variant of search_single_query on a shared httpx HTTP/2 client"""
+        start_time = time.time()
+        body = self._create_search_body(search_text)
+        try:
+            for attempt in range(_MAX_RETRIES + 1):
+                response = await client.post(self.endpoint, content=body, headers=self._async_headers())
+                if response.status_code not in _RETRY_STATUSES or attempt == _MAX_RETRIES:
+                    break
+                # Same policy as the sync session: honor Retry-After, otherwise back off exponentially
+                delay = self._retry_after_seconds(response) if "Retry-After" in response.headers else 0.5 * 2 ** attempt
+                await asyncio.sleep(delay)
+        except httpx.HTTPError as e:
+            return self._request_error_result(query_id, search_text, time.time() - start_time, e)
+        
+        result = self._response_result(query_id, search_text, time.time() - start_time, response.status_code, response.content)
+        if response.status_code == 429:
+            # Still throttled after retries: hold this slot so queued queries back off too
+            await asyncio.sleep(self._retry_after_seconds(response))
+        return result
+    
+    def search_batch(self, queries):
+        """Search several (query_id, search_text) pairs in one request; returns None if the batch shape is not usable"""
+        session = self._get_session()
+        start_time = time.time()
+        try:
+            body = _dumps_bytes({"searchTexts": [search_text for _, search_text in queries], **self._base_payload()})
+            if self.compress_requests:
+                body = gzip.compress(body, compresslevel=1)
+            response = session.post(self.endpoint, data=body, timeout=30)
+        except requests.exceptions.RequestException as e:
+            logger.info(f"✗ Batch of {len(queries)} queries: Request error - {str(e)}")
+            return None
+        
+        if response.status_code == 400:
+            self._batch_supported = False
+            logger.info("⚠️ Endpoint rejected batched searchTexts (HTTP 400); falling back to one query per request")
+            return None
+        if response.status_code != 200:
+            return None
+        
+        try:
+            response_data = orjson.loads(response.content) if orjson else response.json()
+        except json.JSONDecodeError:
+            return None
+        # Expect one response per search text, either as a bare list or under "responses"
+        responses = response_data if isinstance(response_data, list) else response_data.get("responses")
+        # Every item must be a response object with a "value" list, or the whole batch is redone singly
+        if (not isinstance(responses, list) or len(responses) != len(queries)
+                or not all(isinstance(item, dict) and isinstance(item.get("value", []), list) for item in responses)):
+            self._batch_supported = False
+            logger.info("⚠️ Unexpected batch response shape; falling back to one query per request")
+            return None
+        
+        duration = time.time() - start_time
+        ts_ms = int(time.time() * 1000)
+        results = []
+        for (query_id, search_text), query_data in zip(queries, responses):
             result = {
-                "query_id": query_id or len(self.results) + 1,
+                "query_id": query_id,
                 "search_text": search_text,
                 "duration_seconds": round(duration, 2),
-                "timestamp": datetime.now().isoformat(),
+                "ts_ms": ts_ms,
                 "status_code": response.status_code,
-                "success": response.status_code == 200
+                "success": True,
+                "result_count": len(query_data.get("value", []))
             }
+            if self.keep_response_data:
+                result["response_data"] = query_data
+            results.append(result)
+            logger.info(f"✓ Query {query_id}: '{search_text[:50]}...' - {result['result_count']} results ({duration:.2f}s, batched)")
+        return results
+    
+    def _search_groups(self, groups):
+        """Search the first query of each group, batched when enabled, returning one result per group"""
+        queries = [group[0] for group in groups]
+        if len(queries) > 1 and self._batch_supported:
+            results = self.search_batch(queries)
+            if results is not None:
+                return results
+        return [self.search_single_query(search_text, query_id) for query_id, search_text in queries]
+    
+    def _record_result(self, result, results):
+        """Keep a completed result in memory, or stream it straight to the NDJSON file"""
+        self.completed_count += 1
+        if result.get("success", False):
+            self.successful_count += 1
+        
+        if self._stream_fp:
+            self._stream_fp.write(_dumps_line(result))
+        else:
+            results.append(result)
+    
+    @staticmethod
+    def _clone_result(result, query_id, search_text):
+        """Copy a completed result for a duplicate query under its own query_id"""
+        clone = dict(result)
+        clone["duplicate_of"] = result.get("query_id")
+        clone["query_id"] = query_id
+        clone["search_text"] = search_text
+        return clone
+    
+    def _record_group(self, group, result, results):
+        """Record a group's result, then fan it out to the group's duplicate queries"""
+        self._record_result(result, results)
+        for duplicate_id, duplicate_text in group[1:]:
+            self._record_result(self._clone_result(result, duplicate_id, duplicate_text), results)
+    
+    def _run_groups_threaded(self, groups, results):
+        """Search each query group on the thread pool, recording results on the calling thread"""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # Keep at most 2 * max_workers futures outstanding, submitting the next unit
+            # as each one completes, so memory stays bounded for very large batches.
+            # A unit is batch_size query groups (a single group unless batching is enabled).
+            window = 2 * self.max_workers
+            group_iter = iter(groups.values())
+            pending = {}
+            completed = 0
+            total = len(groups)
+            progress_every = max(1, total // 100)
+            next_progress = progress_every
             
-            if response.status_code == 200:
-                try:
-                    response_data = response.json()
-                    result["response_data"] = response_data
-                    result["result_count"] = len(response_data.get("value", []))
-                    print(f"✓ Query {query_id}: '{search_text[:50]}...' - {result['result_count']} results ({duration:.2f}s)")
-                except json.JSONDecodeError as e:
-                    result["error"] = f"JSON decode error: {str(e)}"
-                    result["raw_response"] = response.text
-                    print(f"✗ Query {query_id}: JSON decode error")
-            else:
-                result["error"] = f"HTTP {response.status_code}: {response.text}"
-                print(f"✗ Query {query_id}: HTTP {response.status_code}")
-            
-            with self.lock:
-                self.results.append(result)
-            
-            return result
-            
-        except requests.exceptions.RequestException as e:
-            end_time = time.time()
-            duration = end_time - start_time
-            
-            result = {
-                "query_id": query_id or len(self.results) + 1,
-                "search_text": search_text,
-                "duration_seconds": round(duration, 2),
-                "timestamp": datetime.now().isoformat(),
-                "success": False,
-                "error": f"Request error: {str(e)}"
-            }
+            while True:
+                while len(pending) < window:
+                    unit = list(islice(group_iter, self.batch_size))
+                    if not unit:
+                        break
+                    pending[executor.submit(self._search_groups, unit)] = unit
+                
+                if not pending:
+                    break
+                
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    unit = pending.pop(future)
+                    completed += len(unit)
+                    
+                    try:
+                        unit_results = future.result()
+                    except Exception as e:
+                        for group in unit:
+                            logger.info(f"✗ Query {group[0][0]}: Exception - {str(e)}")
+                        continue
+                    
+                    for group, result in zip(unit, unit_results):
+                        self._record_group(group, result, results)
+                    
+                    if completed >= next_progress or completed == total:
+                        next_progress = completed + progress_every
+                        progress = (completed / total) * 100
+                        logger.info(f"Progress: {completed}/{total} ({progress:.1f}%)")
+    
+    async def _run_groups_async(self, groups, results):
+        """Search each query group on one event loop, multiplexed over a shared HTTP/2 client"""
+        # The semaphore caps in-flight requests at max_workers; HTTP/2 carries them as
+        # streams on a few connections instead of one socket per thread
+        semaphore = asyncio.Semaphore(self.max_workers)
+        limits = httpx.Limits(max_connections=self.max_workers, max_keepalive_connections=self.max_workers)
+        async with httpx.AsyncClient(http2=True, limits=limits, timeout=30) as client:
+            async def search_group(group):
+                query_id, search_text = group[0]
+                async with semaphore:
+                    return await self.asearch_single_query(client, search_text, query_id)
             
-            with self.lock:
-                self.results.append(result)
+            # Same bounded window as the thread pool, so very large batches never create every task up front
+            window = 2 * self.max_workers
+            group_iter = iter(groups.values())
+            pending = {}
+            completed = 0
+            total = len(groups)
+            progress_every = max(1, total // 100)
+            next_progress = progress_every
             
-            print(f"✗ Query {query_id}: Request error - {str(e)}")
-            return result
+            try:
+                while True:
+                    for group in islice(group_iter, window - len(pending)):
+                        pending[asyncio.create_task(search_group(group))] = group
+                    
+                    if not pending:
+                        break
+                    
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        group = pending.pop(task)
+                        completed += 1
+                        
+                        try:
+                            result = task.result()
+                        except Exception as e:
+                            logger.info(f"✗ Query {group[0][0]}: Exception - {str(e)}")
+                            continue
+                        
+                        self._record_group(group, result, results)
+                        
+                        if completed >= next_progress or completed == total:
+                            next_progress = completed + progress_every
+                            progress = (completed / total) * 100
+                            logger.info(f"Progress: {completed}/{total} ({progress:.1f}%)")
+            finally:
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
     
-    def run_batch_search(self, search_queries):
-        """Run multiple search queries with threading"""
-        print(f"Starting batch search with {len(search_queries)} queries using {self.max_workers} threads")
-        print(f"Target endpoint: {self.endpoint}")
-        print("-" * 80)
+    def run_batch_search(self, search_queries, query_ids=None, use_async=False):
+        """Run multiple search queries with threading, or on an HTTP/2 event loop when use_async is set (query_ids defaults to 1..N)"""
+        if use_async and httpx is None:
+            logger.info('⚠️ --async requires httpx with HTTP/2 support (pip install "httpx[http2]"); using worker threads')
+            use_async = False
+        if use_async and self.batch_size > 1:
+            logger.info("⚠️ --batch-size is not used by the async runner; sending one query per request")
+        
+        mode = "concurrent HTTP/2 requests" if use_async else "threads"
+        logger.info(f"Starting batch search with {len(search_queries)} queries using {self.max_workers} {mode}")
+        logger.info(f"Target endpoint: {self.endpoint}")
+        logger.info("-" * 80)
         
         start_time = time.time()
         
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # Submit all tasks
-            future_to_query = {}
-            for i, query in enumerate(search_queries):
-                if isinstance(query, dict):
-                    search_text = query.get("question", query.get("query", str(query)))
-                else:
-                    search_text = str(query)
-                
-                future = executor.submit(self.search_single_query, search_text, i + 1)
-                future_to_query[future] = (i + 1, search_text)
-            
-            # Process completed tasks
-            completed = 0
-            for future in as_completed(future_to_query):
-                completed += 1
-                query_id, search_text = future_to_query[future]
-                
-                try:
-                    result = future.result()
-                    progress = (completed / len(search_queries)) * 100
-                    print(f"Progress: {completed}/{len(search_queries)} ({progress:.1f}%)")
-                except Exception as e:
-                    print(f"✗ Query {query_id}: Exception - {str(e)}")
+        # Group queries by normalized text up front: only the first occurrence is sent,
+        # and its result is fanned out to the repeats as soon as it completes
+        groups = {}
+        for i, query in enumerate(search_queries):
+            search_text = _query_text(query)
+            query_id = query_ids[i] if query_ids else i + 1
+            groups.setdefault(search_text.strip().lower(), []).append((query_id, search_text))
+        
+        duplicate_count = len(search_queries) - len(groups)
+        if duplicate_count:
+            logger.info(f"Skipping {duplicate_count} duplicate queries (results reused from the first occurrence)")
+        
+        # Workers only return their result; collection happens here on the calling thread
+        # (or the event loop), so no lock is needed around the results list or the stream file
+        results = []
+        self.completed_count = 0
+        self.successful_count = 0
+        if self.stream_file:
+            self._stream_fp = open(self.stream_file, "ab")
+        try:
+            if use_async:
+                asyncio.run(self._run_groups_async(groups, results))
+            else:
+                self._run_groups_threaded(groups, results)
+        finally:
+            # Keep partial results available for save_results on interruption
+            self.results = results
+            if self._stream_fp:
+                self._stream_fp.close()
+                self._stream_fp = None
         
         end_time = time.time()
         total_duration = end_time - start_time
         
-        print("-" * 80)
-        print(f"Batch search completed in {total_duration:.2f} seconds")
-        print(f"Average time per query: {total_duration/len(search_queries):.2f} seconds")
+        logger.info("-" * 80)
+        logger.info(f"Batch search completed in {total_duration:.2f} seconds")
+        logger.info(f"Average time per query: {total_duration/len(search_queries):.2f} seconds")
         
         # Print summary
-        successful = sum(1 for r in self.results if r.get("success", False))
-        failed = len(self.results) - successful
+        successful = self.successful_count
+        failed = self.completed_count - successful
         
-        print(f"Results summary:")
-        print(f"  ✓ Successful: {successful}")
-        print(f"  ✗ Failed: {failed}")
-        print(f"  📊 Total queries: {len(self.results)}")
+        logger.info(f"Results summary:")
+        logger.info(f"  ✓ Successful: {successful}")
+        logger.info(f"  ✗ Failed: {failed}")
+        logger.info(f"  📊 Total queries: {self.completed_count}")
         
         return self.results
     
+    def run_sharded_search(self, search_queries, shards, use_async=False):
+        """Split queries across shard processes, each with its own runner, and merge their NDJSON output"""
+        if not self.stream_file:
+            raise ValueError("Sharded search requires a stream_file for the merged NDJSON output")
+        
+        total = len(search_queries)
+        shard_workers = max(1, self.max_workers // shards)
+        shard_args = [
+            (f"{self.stream_file}.shard{i}", search_queries[i::shards], list(range(i + 1, total + 1, shards)),
+             shard_workers, self.keep_response_data, self.compress_requests, self.batch_size, use_async)
+            for i in range(shards)
+        ]
+        print(f"Running {total} queries across {shards} processes ({shard_workers} threads each)")
+        
+        with multiprocessing.get_context("spawn").Pool(shards) as pool:
+            outputs = pool.map(_run_shard, shard_args)
+        
+        self.completed_count = 0
+        self.successful_count = 0
+        with open(self.stream_file, "ab") as merged:
+            for shard_file, completed, successful in outputs:
+                with open(shard_file, "rb") as src:
+                    shutil.copyfileobj(src, merged)
+                os.remove(shard_file)
+                self.completed_count += completed
+                self.successful_count += successful
+        
+        print(f"Merged {shards} shard files into: {self.stream_file}")
+        return self.stream_file
+    
     def save_results(self, filename=None):
-        """Save results to JSON file"""
+        """Save results to JSON file (or, when streaming, a metadata sidecar next to the NDJSON file)"""
+        if self.stream_file:
+            return self._save_stream_metadata(filename)
+        
         if not filename:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"unstructured_search_results_{timestamp}.json"
         
-        # Sort results by query_id for consistent output
-        sorted_results = sorted(self.results, key=lambda x: x.get("query_id", 0))
+        # Sort results by query_id for consistent output (in place; every result carries a query_id)
+        sorted_results = self.results
+        sorted_results.sort(key=operator.itemgetter("query_id"))
         
         output_data = {
             "metadata": {
@@ -203,11 +640,84 @@ class UnstructuredSearchRunner:
             "results": sorted_results
         }
         
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(output_data, f, indent=2, ensure_ascii=False)
+        if orjson:
+            # Write the serialized bytes straight to the file descriptor, bypassing the buffered writer
+            fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                buf = memoryview(orjson.dumps(output_data, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS))
+                while buf:
+                    buf = buf[os.write(fd, buf):]
+            finally:
+                os.close(fd)
+        else:
+            with open(filename, 'w', encoding='utf-8') as f:
+                json.dump(output_data, f, indent=2, ensure_ascii=False)
         
         print(f"Results saved to: {filename}")
         return filename
+    
+    def _save_stream_metadata(self, filename=None):
+        """Write run metadata for a streamed NDJSON results file"""
+        if not filename:
+            filename = str(Path(self.stream_file).with_suffix(".meta.json"))
+        
+        metadata = {
+            "timestamp": datetime.now().isoformat(),
+            "total_queries": self.completed_count,
+            "successful_queries": self.successful_count,
+            "failed_queries": self.completed_count - self.successful_count,
+            "endpoint": self.endpoint,
+            "search_type": "unstructured_semantic",
+            "results_file": self.stream_file
+        }
+        
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump({"metadata": metadata}, f, indent=2, ensure_ascii=False)
+        
+        print(f"Results streamed to: {self.stream_file}")
+        print(f"Metadata saved to: {filename}")
+        return filename
+
+def _run_shard(args):
+    """Run one shard of queries in a worker process, streaming its results to its own NDJSON file"""
+    shard_file, queries, query_ids, max_workers, keep_response_data, compress_requests, batch_size, use_async = args
+    runner = UnstructuredSearchRunner(
+        max_workers=max_workers,
+        stream_file=shard_file,
+        keep_response_data=keep_response_data,
+        compress_requests=compress_requests,
+        batch_size=batch_size
+    )
+    with queued_stdout_logging():
+        runner.run_batch_search(queries, query_ids, use_async=use_async)
+    return shard_file, runner.completed_count, runner.successful_count
+
+def _query_text(query):
+    """Search text for a query entry (plain string or question dict)"""
+    if isinstance(query, dict):
+        return query.get("question", query.get("query", str(query)))
+    return str(query)
+
+def _load_query_file(json_file):
+    """Load the query texts from one test case file; returns [] on failure"""
+    try:
+        if ijson:
+            # Stream items so only the query strings are kept, not the whole parsed file
+            with open(json_file, "rb") as f:
+                first = f.read(64).lstrip()[:1]
+                f.seek(0)
+                prefix = "item" if first == b"[" else "questions.item"
+                return [_query_text(q) for q in ijson.items(f, prefix, use_float=True)]
+        
+        raw = json_file.read_bytes()
+        data = orjson.loads(raw) if orjson else json.loads(raw)
+        if isinstance(data, list):
+            return [_query_text(q) for q in data]
+        elif isinstance(data, dict) and "questions" in data:
+            return [_query_text(q) for q in data["questions"]]
+    except Exception as e:
+        print(f"Error loading {json_file}: {e}")
+    return []
 
 def load_test_queries():
     """Load test queries from various sources"""
@@ -217,16 +727,11 @@ def load_test_queries():
     test_case_dir = Path("test_case")
     if test_case_dir.exists():
         print("Loading queries from test_case directory...")
-        for json_file in test_case_dir.glob("*.json"):
-            try:
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    if isinstance(data, list):
-                        queries.extend(data)
-                    elif isinstance(data, dict) and "questions" in data:
-                        queries.extend(data["questions"])
-            except Exception as e:
-                print(f"Error loading {json_file}: {e}")
+        # Read and parse files concurrently to overlap disk latency; map() keeps file order
+        files = list(test_case_dir.glob("*.json"))
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            for file_queries in executor.map(_load_query_file, files):
+                queries.extend(file_queries)
     
     # If no test cases found, use sample queries
     if not queries:
@@ -244,11 +749,68 @@ def load_test_queries():
             "camping supplies"
         ]
     
+    # Drop repeated queries (case/whitespace-insensitive), keeping the first occurrence in order
+    seen = set()
+    unique_queries = []
+    for query in queries:
+        key = query.strip().lower()
+        if key not in seen:
+            seen.add(key)
+            unique_queries.append(query)
+    duplicates_dropped = len(queries) - len(unique_queries)
+    if duplicates_dropped:
+        print(f"Dropped {duplicates_dropped} duplicate queries")
+    queries = unique_queries
+    
     print(f"Loaded {len(queries)} queries")
     return queries
 
+def expand_timestamps(filename):
+    """Write a copy of a results file (JSON or NDJSON) with ts_ms expanded to ISO timestamps"""
+    def expand(record):
+        if "ts_ms" in record:
+            record["timestamp"] = datetime.fromtimestamp(record.pop("ts_ms") / 1000).isoformat()
+        return record
+    
+    path = Path(filename)
+    output = path.with_name(f"{path.stem}.iso{path.suffix}")
+    if path.suffix == ".ndjson":
+        with open(path, 'rb') as src, open(output, 'wb') as dst:
+            for line in src:
+                if line.strip():
+                    dst.write(_dumps_line(expand(json.loads(line))))
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for record in data.get("results", []):
+            expand(record)
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+    
+    print(f"Expanded timestamps written to: {output}")
+    return str(output)
+
 def main():
     """Main execution function"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Multi-threaded Unstructured Dataverse Search')
+    parser.add_argument('--workers', '-w', type=int, default=10, help='Number of concurrent worker threads, or in-flight requests with --async (default: 10)')
+    parser.add_argument('--ndjson', action='store_true', help='Stream results to an NDJSON file as they complete instead of buffering them in memory')
+    parser.add_argument('--keep-response-data', action='store_true', help='Store the full response body in each result (default: counts and status only)')
+    parser.add_argument('--gzip-requests', action='store_true', help='gzip-compress request bodies (server must accept Content-Encoding: gzip)')
+    parser.add_argument('--batch-size', type=int, default=1, help='Queries per request via searchTexts (default: 1; falls back to 1 if the endpoint rejects batches)')
+    parser.add_argument('--shards', type=int, nargs='?', const=max(1, (os.cpu_count() or 2) // 2), default=1,
+                        help='Split queries across this many processes (default: 1; bare --shards uses half the CPU cores). Implies --ndjson')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='Run requests on one asyncio event loop over HTTP/2 (requires httpx[http2]; falls back to worker threads)')
+    parser.add_argument('--expand-ts', metavar='FILE', help='Convert ts_ms fields in an existing results file to ISO timestamps and exit')
+    args = parser.parse_args()
+    
+    if args.expand_ts:
+        expand_timestamps(args.expand_ts)
+        return
+    
     print("Unstructured Dataverse Search Runner")
     print("="*50)
     
@@ -260,20 +822,33 @@ def main():
         return
     
     # Create runner and execute
-    runner = UnstructuredSearchRunner(max_workers=10)
+    stream_file = None
+    if args.ndjson or args.shards > 1:
+        stream_file = f"unstructured_search_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.ndjson"
+    runner = UnstructuredSearchRunner(
+        max_workers=args.workers,
+        stream_file=stream_file,
+        keep_response_data=args.keep_response_data,
+        compress_requests=args.gzip_requests,
+        batch_size=args.batch_size
+    )
     
     try:
-        results = runner.run_batch_search(queries)
+        if args.shards > 1:
+            runner.run_sharded_search(queries, args.shards, use_async=args.use_async)
+        else:
+            with queued_stdout_logging():
+                runner.run_batch_search(queries, use_async=args.use_async)
         filename = runner.save_results()
         
         print(f"\n🎉 Search completed successfully!")
         print(f"📄 Results saved to: {filename}")
-        print(f"📈 Processed {len(results)} queries")
+        print(f"📈 Processed {runner.completed_count} queries")
         
     except KeyboardInterrupt:
         print("\n❌ Search interrupted by user")
-        if runner.results:
-            filename = runner.save_results("interrupted_results.json")
+        if runner.completed_count:
+            filename = runner.save_results(None if runner.stream_file else "interrupted_results.json")
             print(f"💾 Partial results saved to: {filename}")
         sys.exit(1)
     except Exception as e:
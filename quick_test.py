@@ -1,14 +1,30 @@
 from multi_thread_agentic_search import AgenticSearchClient
 import json
 
-client = AgenticSearchClient()
-result = client.search('Do you have premium accessory?')
-print('Result count:', result['result_count'])
-print('Success:', result['success'])
-response_data = result['response_data']
-print('API Success:', response_data.get('Success'))
-print('Error:', response_data.get('Error', 'None'))
-if result['result_count'] > 0:
-    print('Products found:')
-    for p in result['extracted_products'][:3]:
-        print(f'  - {p["name"]} - ${p["price"]}')
+_client = None
+
+
+def get_client():
+    """Return a module-level AgenticSearchClient, creating it on first use"""
+    global _client
+    if _client is None:
+        _client = AgenticSearchClient()
+    return _client
+
+
+def run_once(query='Do you have premium accessory?'):
+    """Run a single search through the shared client"""
+    return get_client().search(query)
+
+
+if __name__ == "__main__":
+    result = run_once()
+    print('Result count:', result['result_count'])
+    print('Success:', result['success'])
+    response_data = result['response_data']
+    print('API Success:', response_data.get('Success'))
+    print('Error:', response_data.get('Error', 'None'))
+    if result['result_count'] > 0:
+        print('Products found:')
+        for p in result['extracted_products'][:3]:
+            print(f'  - {p["name"]} - ${p["price"]}')
@@ -0,0 +1,21 @@
+#!/bin/bash
+
+# Run a scoring/analysis script under PyPy
+# Usage: ./run_pypy.sh analyze_search_results.py <jsonl_file_path> [scoring_processes]
+#        PYPY=/opt/pypy3.10/bin/pypy3 ./run_pypy.sh analyze_agentic_search_results.py <jsonl_file_path>
+
+PYPY="${PYPY:-pypy3}"
+
+if [ $# -lt 1 ]; then
+    echo "Usage: ./run_pypy.sh <script.py> [args...]"
+    exit 1
+fi
+
+if ! command -v "$PYPY" > /dev/null 2>&1; then
+    echo "❌ PyPy interpreter not found: $PYPY"
+    echo "Install PyPy 3.10+ or set PYPY to its path"
+    exit 1
+fi
+
+echo "🚀 Running $1 with $("$PYPY" -c 'import sys; print(sys.implementation.name, sys.version.split()[0])')"
+exec "$PYPY" "$@"
@@ -6,46 +6,214 @@ Generate comprehensive Excel report with detailed comparisons
 """
 
 import json
-import pandas as pd
 from datetime import datetime
-import os
+import stat
+import sys
 from pathlib import Path
+from functools import cached_property
+from operator import itemgetter, getitem
+from functools import reduce
+from importlib.util import find_spec
+from concurrent.futures import ThreadPoolExecutor
+
+# numpy and pandas are imported inside the functions that use them, so the CLI can report
+# a missing input file without paying their import cost
+
+try:
+    import orjson  # C-accelerated JSON; falls back to the stdlib json module when missing
+except ImportError:
+    orjson = None
+
+# (label, agentic key, dataverse key) as dotted paths into the extracted metrics
+PERFORMANCE_METRICS = [
+    ('Total Searches', 'performance.total_searches', 'performance.total_searches'),
+    ('Successful Searches', 'performance.search_execution_successful', 'performance.successful_searches'),
+    ('Success Rate (%)', 'performance.search_execution_success_rate', 'performance.success_rate'),
+    ('Average Response Time (ms)', 'performance.avg_response_time_ms', 'performance.avg_response_time_ms'),
+    ('Median Response Time (ms)', 'performance.median_response_time_ms', 'performance.median_response_time_ms'),
+    ('P95 Response Time (ms)', 'performance.p95_response_time_ms', 'performance.p95_response_time_ms'),
+    ('P99 Response Time (ms)', 'performance.p99_response_time_ms', 'performance.p99_response_time_ms'),
+    ('Min Response Time (ms)', 'performance.min_response_time_ms', 'performance.min_response_time_ms'),
+    ('Max Response Time (ms)', 'performance.max_response_time_ms', 'performance.max_response_time_ms'),
+    ('Zero Results Rate (%)', 'coverage.zero_results_rate', 'coverage.zero_results_rate')
+]
+
+# Relevance metric groups (group key, label prefix, key prefix), each reported at these K values,
+# followed by the two whole-ranking scores
+RELEVANCE_AT_K = [
+    ('precision_at_k', 'Precision', 'P'),
+    ('recall_at_k', 'Recall', 'R'),
+    ('f1_score_at_k', 'F1', 'F1'),
+    ('ndcg_at_k', 'NDCG', 'NDCG')
+]
+RELEVANCE_K_VALUES = (1, 3, 5, 10)
+RELEVANCE_LABELS = [f"{label}@{k}" for _, label, _ in RELEVANCE_AT_K for k in RELEVANCE_K_VALUES] + ['MAP Score', 'MRR Score']
+
+# Pre-bound getters: one call fetches all four groups, one per group fetches its @K values
+_relevance_groups = itemgetter(*(group for group, _, _ in RELEVANCE_AT_K))
+_relevance_group_values = [itemgetter(*(f"{prefix}@{k}" for k in RELEVANCE_K_VALUES)) for _, _, prefix in RELEVANCE_AT_K]
+_relevance_scores = itemgetter('map_score', 'mrr_score')
+
+# xlsxwriter serializes workbooks faster and with less memory than openpyxl; use it when installed.
+# (constant_memory mode is not enabled: pandas writes cells column by column, which that mode drops.)
+EXCEL_ENGINE = 'xlsxwriter' if find_spec('xlsxwriter') else 'openpyxl'
+
+# Sections of an analysis file, by the names used in the extracted metrics
+_DATA_SECTIONS = {'performance': 'search_performance', 'relevance': 'relevance_metrics', 'coverage': 'coverage_metrics'}
+
+def _required_keys(engine_column, extra=()):
+    """Dotted paths into an analysis file that the report reads for one engine"""
+    paths = [row[engine_column] for row in PERFORMANCE_METRICS]
+    paths += [f"relevance.{group}.{prefix}@{k}" for group, _, prefix in RELEVANCE_AT_K for k in RELEVANCE_K_VALUES]
+    paths += ['relevance.map_score', 'relevance.mrr_score', 'relevance.question_type_breakdown', *extra]
+    return tuple(f"{_DATA_SECTIONS[section]}.{rest}" for section, rest in (path.split('.', 1) for path in paths))
+
+REQUIRED_AGENTIC_KEYS = _required_keys(1, extra=['performance.throttling_rate'])
+REQUIRED_DATAVERSE_KEYS = _required_keys(2)
+
+# Question types broken down in the question type comparison, in report order
+QUESTION_TYPES = ['Exact word', 'Category', 'Category + Price range', 'Category + Attribute value', 'Description']
+
+# (label, metric group, key) compared for each question type
+QUESTION_TYPE_METRICS = [
+    ('Precision@1', 'precision_at_k', 'P@1'),
+    ('Recall@10', 'recall_at_k', 'R@10'),
+    ('F1@5', 'f1_score_at_k', 'F1@5'),
+    ('NDCG@10', 'ndcg_at_k', 'NDCG@10')
+]
+
+# Excel number format for each executive summary row (values stay numeric in the sheet)
+SUMMARY_NUMBER_FORMATS = [
+    '0.00"%"',      # Search Success Rate
+    '0.00" ms"',    # Average Response Time
+    '0.0000',       # MAP Score
+    '0.0000',       # NDCG@10
+    '0.0000',       # Precision@1
+    '0.0000',       # Recall@10
+    '0.0"%"',       # Throttling Impact
+    '0.0"%"'        # Zero Results Rate
+]
+
+# Whether a higher value wins for each executive summary row
+SUMMARY_HIGHER_IS_BETTER = (True, False, True, True, True, True, False, False)
+
+def _apply_row_number_formats(writer, sheet_name, df, columns, row_formats):
+    """Apply a number format per data row to the given columns of a sheet written with index=False"""
+    worksheet = writer.sheets[sheet_name]
+    col_indexes = [df.columns.get_loc(column) for column in columns]
+    
+    if EXCEL_ENGINE == 'xlsxwriter':
+        # xlsxwriter cannot restyle written cells, so rewrite the numbers with a shared format per code
+        formats = {code: writer.book.add_format({'num_format': code}) for code in set(row_formats)}
+        for row, code in enumerate(row_formats, start=1):
+            for col in col_indexes:
+                worksheet.write_number(row, col, df.iat[row - 1, col], formats[code])
+    else:
+        for row, code in enumerate(row_formats, start=2):
+            for col in col_indexes:
+                worksheet.cell(row=row, column=col + 1).number_format = code
+
+def _load_json(path):
+    """Load a JSON file, using orjson when available"""
+    if orjson:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _lookup(data, dotted):
+    """Look up a dotted key path in nested dicts (raises KeyError if a level is missing)"""
+    return reduce(getitem, dotted.split('.'), data)
+
+def _validate_analysis(data, label, required_keys):
+    """Check every required dotted key path once, so later lookups can index directly"""
+    for dotted in required_keys:
+        try:
+            _lookup(data, dotted)
+        except (KeyError, TypeError):
+            raise ValueError(f"{label} analysis file is missing required key '{dotted}'") from None
+
+def _metric_array(metrics, engine, keys):
+    """Collect one engine's values for the given dotted keys into a float64 array"""
+    import numpy as np
+    root = {section: values[engine] for section, values in metrics.items()}
+    return np.fromiter((_lookup(root, key) for key in keys), dtype=np.float64, count=len(keys))
+
+def _relevance_values(relevance):
+    """Relevance metric values for one engine, in RELEVANCE_LABELS order"""
+    import numpy as np
+    values = []
+    for group, get_values in zip(_relevance_groups(relevance), _relevance_group_values):
+        values.extend(get_values(group))
+    values.extend(_relevance_scores(relevance))
+    return np.array(values, dtype=np.float64)
+
+def _comparison_frame(labels, a, d, decimals):
+    """Build a comparison table with vectorized difference and numeric % improvement (NaN when D is 0)"""
+    import numpy as np
+    import pandas as pd
+    improvement = np.full_like(a, np.nan)
+    np.divide((a - d) * 100, d, out=improvement, where=d != 0)
+    # Values stay unrounded until the table is complete, then get a single rounding pass
+    return pd.DataFrame({
+        'Metric': labels,
+        'Agentic Search': a,
+        'Dataverse Search': d,
+        'Difference (A-D)': a - d,
+        '% Improvement': improvement
+    }).round({'Agentic Search': decimals, 'Dataverse Search': decimals, 'Difference (A-D)': decimals, '% Improvement': 1})
 
 class SearchComparisonAnalyzer:
     def __init__(self):
         self.agentic_data = None
         self.dataverse_data = None
         self.comparison_results = {}
+        # Flat shortcuts into the loaded data, set by load_analysis_files
+        self._agentic_perf = None
+        self._dataverse_perf = None
+        self._agentic_cov = None
+        self._dataverse_cov = None
         
     def load_analysis_files(self, agentic_file, dataverse_file):
         """Load both analysis files"""
         print("📊 Loading analysis files...")
         
-        # Load Agentic Search Results
-        with open(agentic_file, 'r', encoding='utf-8') as f:
-            self.agentic_data = json.load(f)
+        # Load Agentic and Dataverse Search Results concurrently (file reads and orjson parsing release the GIL)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            agentic_future = executor.submit(_load_json, agentic_file)
+            dataverse_future = executor.submit(_load_json, dataverse_file)
+            self.agentic_data = agentic_future.result()
+            self.dataverse_data = dataverse_future.result()
         print(f"✅ Loaded agentic search data: {len(self.agentic_data)} keys")
-        
-        # Load Dataverse Search Results  
-        with open(dataverse_file, 'r', encoding='utf-8') as f:
-            self.dataverse_data = json.load(f)
         print(f"✅ Loaded dataverse search data: {len(self.dataverse_data)} keys")
         
-    def extract_key_metrics(self):
-        """Extract key metrics for comparison"""
+        # Validate the schema once; everything downstream indexes the data directly
+        _validate_analysis(self.agentic_data, 'Agentic', REQUIRED_AGENTIC_KEYS)
+        _validate_analysis(self.dataverse_data, 'Dataverse', REQUIRED_DATAVERSE_KEYS)
+        
+        self._agentic_perf = self.agentic_data['search_performance']
+        self._dataverse_perf = self.dataverse_data['search_performance']
+        self._agentic_cov = self.agentic_data['coverage_metrics']
+        self._dataverse_cov = self.dataverse_data['coverage_metrics']
+        # Drop metrics extracted from previously loaded files
+        self.__dict__.pop('metrics', None)
+        
+    @cached_property
+    def metrics(self):
+        """Key metrics for comparison, extracted once per loaded pair of files"""
         print("🔍 Extracting key metrics...")
         
         # Performance Metrics
-        agentic_perf = self.agentic_data['search_performance']
-        dataverse_perf = self.dataverse_data['search_performance']
+        agentic_perf = self._agentic_perf
+        dataverse_perf = self._dataverse_perf
         
         # Relevance Metrics
         agentic_rel = self.agentic_data['relevance_metrics']
         dataverse_rel = self.dataverse_data['relevance_metrics']
         
         # Coverage Metrics
-        agentic_cov = self.agentic_data['coverage_metrics']
-        dataverse_cov = self.dataverse_data['coverage_metrics']
+        agentic_cov = self._agentic_cov
+        dataverse_cov = self._dataverse_cov
         
         return {
             'performance': {
@@ -66,227 +234,75 @@ class SearchComparisonAnalyzer:
         """Create performance comparison dataframe"""
         print("⚡ Creating performance comparison...")
         
-        agentic = metrics['performance']['agentic']
-        dataverse = metrics['performance']['dataverse']
+        a = _metric_array(metrics, 'agentic', [agentic_key for _, agentic_key, _ in PERFORMANCE_METRICS])
+        d = _metric_array(metrics, 'dataverse', [dataverse_key for _, _, dataverse_key in PERFORMANCE_METRICS])
         
-        performance_data = {
-            'Metric': [
-                'Total Searches',
-                'Successful Searches', 
-                'Success Rate (%)',
-                'Average Response Time (ms)',
-                'Median Response Time (ms)',
-                'P95 Response Time (ms)',
-                'P99 Response Time (ms)',
-                'Min Response Time (ms)',
-                'Max Response Time (ms)',
-                'Zero Results Rate (%)'
-            ],
-            'Agentic Search': [
-                agentic.get('total_searches', 0),
-                agentic.get('search_execution_successful', 0),
-                round(agentic.get('search_execution_success_rate', 0), 2),
-                round(agentic.get('avg_response_time_ms', 0), 2),
-                round(agentic.get('median_response_time_ms', 0), 2),
-                round(agentic.get('p95_response_time_ms', 0), 2),
-                round(agentic.get('p99_response_time_ms', 0), 2),
-                round(agentic.get('min_response_time_ms', 0), 2),
-                round(agentic.get('max_response_time_ms', 0), 2),
-                round(self.agentic_data['coverage_metrics'].get('zero_results_rate', 0), 2)
-            ],
-            'Dataverse Search': [
-                dataverse.get('total_searches', 0),
-                dataverse.get('successful_searches', 0),
-                round(dataverse.get('success_rate', 0), 2),
-                round(dataverse.get('avg_response_time_ms', 0), 2),
-                round(dataverse.get('median_response_time_ms', 0), 2),
-                round(dataverse.get('p95_response_time_ms', 0), 2),
-                round(dataverse.get('p99_response_time_ms', 0), 2),
-                round(dataverse.get('min_response_time_ms', 0), 2),
-                round(dataverse.get('max_response_time_ms', 0), 2),
-                round(self.dataverse_data['coverage_metrics'].get('zero_results_rate', 0), 2)
-            ]
-        }
-        
-        # Calculate differences and improvements
-        performance_data['Difference (A-D)'] = []
-        performance_data['% Improvement'] = []
-        
-        for i, metric in enumerate(performance_data['Metric']):
-            agentic_val = performance_data['Agentic Search'][i]
-            dataverse_val = performance_data['Dataverse Search'][i]
-            
-            if isinstance(agentic_val, (int, float)) and isinstance(dataverse_val, (int, float)):
-                diff = agentic_val - dataverse_val
-                performance_data['Difference (A-D)'].append(round(diff, 2))
-                
-                if dataverse_val != 0:
-                    improvement = ((agentic_val - dataverse_val) / dataverse_val) * 100
-                    performance_data['% Improvement'].append(f"{improvement:.1f}%")
-                else:
-                    performance_data['% Improvement'].append("N/A")
-            else:
-                performance_data['Difference (A-D)'].append("N/A")
-                performance_data['% Improvement'].append("N/A")
-        
-        return pd.DataFrame(performance_data)
+        return _comparison_frame([label for label, _, _ in PERFORMANCE_METRICS], a, d, 2)
     
     def create_relevance_comparison(self, metrics):
         """Create relevance metrics comparison dataframe"""
         print("🎯 Creating relevance comparison...")
         
-        agentic = metrics['relevance']['agentic']
-        dataverse = metrics['relevance']['dataverse']
-        
-        relevance_data = {
-            'Metric': [
-                'Precision@1',
-                'Precision@3', 
-                'Precision@5',
-                'Precision@10',
-                'Recall@1',
-                'Recall@3',
-                'Recall@5',
-                'Recall@10',
-                'F1@1',
-                'F1@3',
-                'F1@5',
-                'F1@10',
-                'NDCG@1',
-                'NDCG@3',
-                'NDCG@5',
-                'NDCG@10',
-                'MAP Score',
-                'MRR Score'
-            ],
-            'Agentic Search': [
-                round(agentic['precision_at_k']['P@1'], 4),
-                round(agentic['precision_at_k']['P@3'], 4),
-                round(agentic['precision_at_k']['P@5'], 4),
-                round(agentic['precision_at_k']['P@10'], 4),
-                round(agentic['recall_at_k']['R@1'], 4),
-                round(agentic['recall_at_k']['R@3'], 4),
-                round(agentic['recall_at_k']['R@5'], 4),
-                round(agentic['recall_at_k']['R@10'], 4),
-                round(agentic['f1_score_at_k']['F1@1'], 4),
-                round(agentic['f1_score_at_k']['F1@3'], 4),
-                round(agentic['f1_score_at_k']['F1@5'], 4),
-                round(agentic['f1_score_at_k']['F1@10'], 4),
-                round(agentic['ndcg_at_k']['NDCG@1'], 4),
-                round(agentic['ndcg_at_k']['NDCG@3'], 4),
-                round(agentic['ndcg_at_k']['NDCG@5'], 4),
-                round(agentic['ndcg_at_k']['NDCG@10'], 4),
-                round(agentic['map_score'], 4),
-                round(agentic['mrr_score'], 4)
-            ],
-            'Dataverse Search': [
-                round(dataverse['precision_at_k']['P@1'], 4),
-                round(dataverse['precision_at_k']['P@3'], 4),
-                round(dataverse['precision_at_k']['P@5'], 4),
-                round(dataverse['precision_at_k']['P@10'], 4),
-                round(dataverse['recall_at_k']['R@1'], 4),
-                round(dataverse['recall_at_k']['R@3'], 4),
-                round(dataverse['recall_at_k']['R@5'], 4),
-                round(dataverse['recall_at_k']['R@10'], 4),
-                round(dataverse['f1_score_at_k']['F1@1'], 4),
-                round(dataverse['f1_score_at_k']['F1@3'], 4),
-                round(dataverse['f1_score_at_k']['F1@5'], 4),
-                round(dataverse['f1_score_at_k']['F1@10'], 4),
-                round(dataverse['ndcg_at_k']['NDCG@1'], 4),
-                round(dataverse['ndcg_at_k']['NDCG@3'], 4),
-                round(dataverse['ndcg_at_k']['NDCG@5'], 4),
-                round(dataverse['ndcg_at_k']['NDCG@10'], 4),
-                round(dataverse['map_score'], 4),
-                round(dataverse['mrr_score'], 4)
-            ]
-        }
-        
-        # Calculate differences and improvements
-        relevance_data['Difference (A-D)'] = []
-        relevance_data['% Improvement'] = []
-        
-        for i in range(len(relevance_data['Metric'])):
-            agentic_val = relevance_data['Agentic Search'][i]
-            dataverse_val = relevance_data['Dataverse Search'][i]
-            
-            diff = agentic_val - dataverse_val
-            relevance_data['Difference (A-D)'].append(round(diff, 4))
-            
-            if dataverse_val != 0:
-                improvement = ((agentic_val - dataverse_val) / dataverse_val) * 100
-                relevance_data['% Improvement'].append(f"{improvement:.1f}%")
-            else:
-                relevance_data['% Improvement'].append("N/A")
+        a = _relevance_values(metrics['relevance']['agentic'])
+        d = _relevance_values(metrics['relevance']['dataverse'])
         
-        return pd.DataFrame(relevance_data)
+        return _comparison_frame(RELEVANCE_LABELS, a, d, 4)
     
     def create_question_type_comparison(self, metrics):
         """Create question type breakdown comparison"""
+        import numpy as np
+        import pandas as pd
         print("❓ Creating question type comparison...")
         
         agentic_qtypes = metrics['relevance']['agentic']['question_type_breakdown']
         dataverse_qtypes = metrics['relevance']['dataverse']['question_type_breakdown']
         
-        # Create comparison for each question type
-        question_types = ['Exact word', 'Category', 'Category + Price range', 'Category + Attribute value', 'Description']
-        
-        comparison_data = []
-        for qtype in question_types:
-            if qtype in agentic_qtypes and qtype in dataverse_qtypes:
-                agentic_q = agentic_qtypes[qtype]
-                dataverse_q = dataverse_qtypes[qtype]
-                
-                comparison_data.append({
-                    'Question Type': qtype,
-                    'Metric': 'Precision@1',
-                    'Agentic': round(agentic_q['precision_at_k']['P@1'], 4),
-                    'Dataverse': round(dataverse_q['precision_at_k']['P@1'], 4),
-                    'Difference': round(agentic_q['precision_at_k']['P@1'] - dataverse_q['precision_at_k']['P@1'], 4)
-                })
-                
-                comparison_data.append({
-                    'Question Type': qtype,
-                    'Metric': 'Recall@10',
-                    'Agentic': round(agentic_q['recall_at_k']['R@10'], 4),
-                    'Dataverse': round(dataverse_q['recall_at_k']['R@10'], 4),
-                    'Difference': round(agentic_q['recall_at_k']['R@10'] - dataverse_q['recall_at_k']['R@10'], 4)
-                })
-                
-                comparison_data.append({
-                    'Question Type': qtype,
-                    'Metric': 'F1@5',
-                    'Agentic': round(agentic_q['f1_score_at_k']['F1@5'], 4),
-                    'Dataverse': round(dataverse_q['f1_score_at_k']['F1@5'], 4),
-                    'Difference': round(agentic_q['f1_score_at_k']['F1@5'] - dataverse_q['f1_score_at_k']['F1@5'], 4)
-                })
-                
-                comparison_data.append({
-                    'Question Type': qtype,
-                    'Metric': 'NDCG@10',
-                    'Agentic': round(agentic_q['ndcg_at_k']['NDCG@10'], 4),
-                    'Dataverse': round(dataverse_q['ndcg_at_k']['NDCG@10'], 4),
-                    'Difference': round(agentic_q['ndcg_at_k']['NDCG@10'] - dataverse_q['ndcg_at_k']['NDCG@10'], 4)
-                })
-        
-        return pd.DataFrame(comparison_data)
+        # Only question types present for both engines are compared
+        present_types = [qtype for qtype in QUESTION_TYPES if qtype in agentic_qtypes and qtype in dataverse_qtypes]
+        
+        # (n_types, n_metrics) value grids; differences are one vectorized pass, rounding one DataFrame pass
+        shape = (len(present_types), len(QUESTION_TYPE_METRICS))
+        a = np.array([[agentic_qtypes[qtype][group][key] for _, group, key in QUESTION_TYPE_METRICS] for qtype in present_types], dtype=np.float64).reshape(shape)
+        d = np.array([[dataverse_qtypes[qtype][group][key] for _, group, key in QUESTION_TYPE_METRICS] for qtype in present_types], dtype=np.float64).reshape(shape)
+        
+        # Flatten row-major to long form: one row per (question type, metric)
+        return pd.DataFrame({
+            'Question Type': np.repeat(present_types, shape[1]),
+            'Metric': np.tile([label for label, _, _ in QUESTION_TYPE_METRICS], shape[0]),
+            'Agentic': a.ravel(),
+            'Dataverse': d.ravel(),
+            'Difference': (a - d).ravel()
+        }).round(4)
     
     def create_executive_summary(self, performance_df, relevance_df):
         """Create executive summary of key findings"""
+        import numpy as np
+        import pandas as pd
         print("📋 Creating executive summary...")
         
+        # Index both tables by metric name once instead of masking the DataFrame per lookup
+        perf_map = performance_df.set_index('Metric')[['Agentic Search', 'Dataverse Search']].to_dict('index')
+        rel_map = relevance_df.set_index('Metric')[['Agentic Search', 'Dataverse Search']].to_dict('index')
+        
         # Key performance insights
-        agentic_success_rate = performance_df[performance_df['Metric'] == 'Success Rate (%)']['Agentic Search'].iloc[0]
-        dataverse_success_rate = performance_df[performance_df['Metric'] == 'Success Rate (%)']['Dataverse Search'].iloc[0]
+        agentic_success_rate = perf_map['Success Rate (%)']['Agentic Search']
+        dataverse_success_rate = perf_map['Success Rate (%)']['Dataverse Search']
         
-        agentic_avg_time = performance_df[performance_df['Metric'] == 'Average Response Time (ms)']['Agentic Search'].iloc[0]
-        dataverse_avg_time = performance_df[performance_df['Metric'] == 'Average Response Time (ms)']['Dataverse Search'].iloc[0]
+        agentic_avg_time = perf_map['Average Response Time (ms)']['Agentic Search']
+        dataverse_avg_time = perf_map['Average Response Time (ms)']['Dataverse Search']
         
         # Key relevance insights
-        agentic_map = relevance_df[relevance_df['Metric'] == 'MAP Score']['Agentic Search'].iloc[0]
-        dataverse_map = relevance_df[relevance_df['Metric'] == 'MAP Score']['Dataverse Search'].iloc[0]
+        agentic_map = rel_map['MAP Score']['Agentic Search']
+        dataverse_map = rel_map['MAP Score']['Dataverse Search']
+        
+        agentic_ndcg10 = rel_map['NDCG@10']['Agentic Search']
+        dataverse_ndcg10 = rel_map['NDCG@10']['Dataverse Search']
+        
+        agentic_p1 = rel_map['Precision@1']['Agentic Search']
+        dataverse_p1 = rel_map['Precision@1']['Dataverse Search']
         
-        agentic_ndcg10 = relevance_df[relevance_df['Metric'] == 'NDCG@10']['Agentic Search'].iloc[0]
-        dataverse_ndcg10 = relevance_df[relevance_df['Metric'] == 'NDCG@10']['Dataverse Search'].iloc[0]
+        agentic_r10 = rel_map['Recall@10']['Agentic Search']
+        dataverse_r10 = rel_map['Recall@10']['Dataverse Search']
         
         summary_data = {
             'Key Insight': [
@@ -299,46 +315,45 @@ class SearchComparisonAnalyzer:
                 'Throttling Impact',
                 'Zero Results Rate'
             ],
+            # Raw numbers; display formats are applied per row when the sheet is written (SUMMARY_NUMBER_FORMATS)
             'Agentic Search': [
-                f"{agentic_success_rate}%",
-                f"{agentic_avg_time} ms",
-                f"{agentic_map:.4f}",
-                f"{agentic_ndcg10:.4f}",
-                f"{relevance_df[relevance_df['Metric'] == 'Precision@1']['Agentic Search'].iloc[0]:.4f}",
-                f"{relevance_df[relevance_df['Metric'] == 'Recall@10']['Agentic Search'].iloc[0]:.4f}",
-                f"{self.agentic_data['search_performance'].get('throttling_rate', 0):.1f}%",
-                f"{self.agentic_data['coverage_metrics'].get('zero_results_rate', 0):.1f}%"
+                agentic_success_rate,
+                agentic_avg_time,
+                agentic_map,
+                agentic_ndcg10,
+                agentic_p1,
+                agentic_r10,
+                self._agentic_perf['throttling_rate'],
+                self._agentic_cov['zero_results_rate']
             ],
             'Dataverse Search': [
-                f"{dataverse_success_rate}%",
-                f"{dataverse_avg_time} ms",
-                f"{dataverse_map:.4f}",
-                f"{dataverse_ndcg10:.4f}",
-                f"{relevance_df[relevance_df['Metric'] == 'Precision@1']['Dataverse Search'].iloc[0]:.4f}",
-                f"{relevance_df[relevance_df['Metric'] == 'Recall@10']['Dataverse Search'].iloc[0]:.4f}",
-                "0.0%",
-                f"{self.dataverse_data['coverage_metrics'].get('zero_results_rate', 0):.1f}%"
-            ],
-            'Winner': [
-                'Dataverse' if dataverse_success_rate > agentic_success_rate else 'Agentic',
-                'Agentic' if agentic_avg_time < dataverse_avg_time else 'Dataverse',
-                'Dataverse' if dataverse_map > agentic_map else 'Agentic',
-                'Dataverse' if dataverse_ndcg10 > agentic_ndcg10 else 'Agentic',
-                'Dataverse' if relevance_df[relevance_df['Metric'] == 'Precision@1']['Dataverse Search'].iloc[0] > relevance_df[relevance_df['Metric'] == 'Precision@1']['Agentic Search'].iloc[0] else 'Agentic',
-                'Dataverse' if relevance_df[relevance_df['Metric'] == 'Recall@10']['Dataverse Search'].iloc[0] > relevance_df[relevance_df['Metric'] == 'Recall@10']['Agentic Search'].iloc[0] else 'Agentic',
-                'Dataverse',
-                'Agentic' if self.agentic_data['coverage_metrics'].get('zero_results_rate', 0) < self.dataverse_data['coverage_metrics'].get('zero_results_rate', 0) else 'Dataverse'
+                dataverse_success_rate,
+                dataverse_avg_time,
+                dataverse_map,
+                dataverse_ndcg10,
+                dataverse_p1,
+                dataverse_r10,
+                0.0,
+                self._dataverse_cov['zero_results_rate']
             ]
         }
         
+        # Winner per row in one comparison: where higher is better Agentic wins ties,
+        # where lower is better (response time, throttling, zero results) Dataverse does
+        a = np.array(summary_data['Agentic Search'], dtype=np.float64)
+        d = np.array(summary_data['Dataverse Search'], dtype=np.float64)
+        agentic_wins = np.where(SUMMARY_HIGHER_IS_BETTER, a >= d, a < d)
+        summary_data['Winner'] = np.where(agentic_wins, 'Agentic', 'Dataverse')
+        
         return pd.DataFrame(summary_data)
     
     def generate_excel_report(self, output_file):
         """Generate comprehensive Excel report"""
+        import pandas as pd
         print("📊 Generating Excel report...")
         
         # Extract metrics
-        metrics = self.extract_key_metrics()
+        metrics = self.metrics
         
         # Create comparison dataframes
         performance_df = self.create_performance_comparison(metrics)
@@ -347,9 +362,10 @@ class SearchComparisonAnalyzer:
         summary_df = self.create_executive_summary(performance_df, relevance_df)
         
         # Write to Excel with multiple sheets
-        with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+        with pd.ExcelWriter(output_file, engine=EXCEL_ENGINE) as writer:
             # Executive Summary
             summary_df.to_excel(writer, sheet_name='Executive Summary', index=False)
+            _apply_row_number_formats(writer, 'Executive Summary', summary_df, ['Agentic Search', 'Dataverse Search'], SUMMARY_NUMBER_FORMATS)
             
             # Performance Comparison
             performance_df.to_excel(writer, sheet_name='Performance Metrics', index=False)
@@ -374,10 +390,10 @@ class SearchComparisonAnalyzer:
                 'Value': [
                     'agentic_results_20250818_002606_results_agentic_analysis.json',
                     'dataverse_results_20250815_014501_results_enhanced_analysis.json',
-                    self.agentic_data['search_performance']['total_searches'],
-                    self.dataverse_data['search_performance']['total_searches'],
-                    self.agentic_data['search_performance']['search_execution_successful'],
-                    self.dataverse_data['search_performance']['successful_searches'],
+                    self._agentic_perf['total_searches'],
+                    self._dataverse_perf['total_searches'],
+                    self._agentic_perf['search_execution_successful'],
+                    self._dataverse_perf['successful_searches'],
                     datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 ]
             }
@@ -391,24 +407,29 @@ def main():
     print("🔍 Search Engine Comparison Analysis")
     print("="*50)
     
-    # Initialize analyzer
-    analyzer = SearchComparisonAnalyzer()
-    
     # File paths
     agentic_file = "test_case_acs_analysis/agentic_results_20250818_002606_results_agentic_analysis.json"
     dataverse_file = "test_case_analysis/dataverse_results_20250815_014501_results_enhanced_analysis.json"
     
-    # Check if files exist
-    if not os.path.exists(agentic_file):
-        print(f"❌ Agentic file not found: {agentic_file}")
-        return
+    # Check both files up front (one stat each) and fail fast before any analysis work
+    for label, file_path in [('Agentic', agentic_file), ('Dataverse', dataverse_file)]:
+        try:
+            file_stat = Path(file_path).stat()
+        except OSError:
+            file_stat = None
+        if file_stat is None or not stat.S_ISREG(file_stat.st_mode):
+            sys.exit(f"❌ {label} file not found: {file_path}")
+        if file_stat.st_size == 0:
+            sys.exit(f"❌ {label} file is empty: {file_path}")
     
-    if not os.path.exists(dataverse_file):
-        print(f"❌ Dataverse file not found: {dataverse_file}")
-        return
+    # Initialize analyzer
+    analyzer = SearchComparisonAnalyzer()
     
     # Load data
-    analyzer.load_analysis_files(agentic_file, dataverse_file)
+    try:
+        analyzer.load_analysis_files(agentic_file, dataverse_file)
+    except ValueError as e:
+        sys.exit(f"❌ {e}")
     
     # Generate output filename
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
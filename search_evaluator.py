@@ -4,17 +4,185 @@ Search Engine Evaluation System
 Calculates comprehensive metrics for search quality assessment
 """
 
+import hashlib
+import heapq
 import json
-import math
+import multiprocessing
+import sqlite3
 import statistics
-from collections import defaultdict, Counter
+import threading
+import time
+from collections import Counter, defaultdict
+from functools import lru_cache
+from operator import mul
 from typing import List, Dict, Any, Tuple, Optional
 from datetime import datetime
 
+import numpy as np
+
+try:
+    import orjson  # C-accelerated JSON; falls back to the stdlib json module when missing
+except ImportError:
+    orjson = None
+
+try:
+    from numba import njit  # optional JIT for the per-query metric and similarity loops
+except ImportError:
+    njit = None
+
+try:
+    import ahocorasick  # optional multi-pattern matcher for attribute scoring
+except ImportError:
+    ahocorasick = None
+
+
+# Per-query metric loops over relevance scores (ints on the 0-3 scale). They use only
+# operations numba can compile; without numba they run as plain Python over a list.
+
+def _average_precision_loop(scores):
+    """Average precision of one ranking (score >= 2 is relevant)"""
+    relevant_count = 0
+    precision_sum = 0.0
+    for i in range(len(scores)):
+        if scores[i] >= 2:
+            relevant_count += 1
+            precision_sum += relevant_count / (i + 1)
+    return precision_sum / relevant_count if relevant_count > 0 else 0.0
+
+def _reciprocal_rank_loop(scores):
+    """Reciprocal rank of the first relevant result (score >= 2), or 0"""
+    for i in range(len(scores)):
+        if scores[i] >= 2:
+            return 1.0 / (i + 1)
+    return 0.0
+
+def _ideal_top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """The K highest scores of a full ranking, unordered (np.partition is O(n))"""
+    return scores if len(scores) <= k else np.partition(scores, -k)[-k:]
+
+if njit:
+    _average_precision_kernel = njit(cache=True)(_average_precision_loop)
+    _reciprocal_rank_kernel = njit(cache=True)(_reciprocal_rank_loop)
+else:
+    # Indexing a NumPy array element by element is slower than a list, so convert first
+    def _average_precision_kernel(scores):
+        return _average_precision_loop(scores.tolist())
+    
+    def _reciprocal_rank_kernel(scores):
+        return _reciprocal_rank_loop(scores.tolist())
+
+def _jaccard_sorted_loop(ids1, ids2):
+    """Jaccard similarity of two sorted, duplicate-free token id arrays via a merge walk"""
+    i = j = intersection = 0
+    while i < len(ids1) and j < len(ids2):
+        if ids1[i] == ids2[j]:
+            intersection += 1
+            i += 1
+            j += 1
+        elif ids1[i] < ids2[j]:
+            i += 1
+        else:
+            j += 1
+    return intersection / (len(ids1) + len(ids2) - intersection)
+
+if njit:
+    _jaccard_kernel = njit(cache=True)(_jaccard_sorted_loop)
+    
+    def _word_ids(text):
+        """Sorted 32-bit hashes of the distinct words in text"""
+        return np.array(sorted({hash(w) & 0xFFFFFFFF for w in text.split()}), dtype=np.uint32)
+else:
+    # Without numba, CPython's set intersection beats a merge walk in the interpreter
+    def _jaccard_kernel(words1, words2):
+        intersection = len(words1 & words2)
+        return intersection / (len(words1) + len(words2) - intersection)
+    
+    def _word_ids(text):
+        """Set of the distinct words in text"""
+        return frozenset(text.split())
+
+# Result names and descriptions repeat across queries, so tokenize each distinct string once
+_tokenize = lru_cache(maxsize=8192)(_word_ids)
+
+def _build_attribute_matcher(attr_vals: frozenset):
+    """Aho-Corasick automaton over the attribute values, or None to use plain substring tests"""
+    # A handful of `in` scans is cheaper than building an automaton for every query
+    if ahocorasick is None or len(attr_vals) <= 3:
+        return None
+    automaton = ahocorasick.Automaton()
+    for value in attr_vals:
+        if value:
+            automaton.add_word(value, value)
+    automaton.make_automaton()
+    return automaton
+
+# Category relationships: a category containing the key is related to one containing any of its terms
+_RELATED_CATEGORIES = {
+    'accessory': ('accessories', 'gear', 'equipment'),
+    'sleeping': ('camping', 'outdoor', 'rest'),
+    'clothing': ('apparel', 'wear', 'garment'),
+}
+
+def _related_category_terms(category: str) -> Tuple[str, ...]:
+    """Substrings whose presence in another (lowercased) category makes it related to this one"""
+    if not category:
+        return ()
+    terms = []
+    for main_cat, related in _RELATED_CATEGORIES.items():
+        if main_cat in category:
+            terms.extend(related)
+        if any(rel in category for rel in related):
+            terms.append(main_cat)
+    return tuple(dict.fromkeys(terms))
+
+
+# Question types whose scorers compare against the result description
+_DESCRIPTION_SCORED_TYPES = frozenset(("Attribute value", "Description"))
+
+# Per-query relevance metrics averaged by _compute_all_metrics
+RELEVANCE_METRICS = ('precision', 'recall', 'ndcg', 'average_precision', 'reciprocal_rank')
+
+# Part of every score cache key: bump it whenever the scoring rules change so old rows are ignored
+SCORE_CACHE_VERSION = 1
+
+
 class SearchEvaluator:
     """Comprehensive search engine evaluation with multiple metrics"""
     
-    def __init__(self):
+    def __init__(self, keep_raw_results: bool = False, k: int = 10, score_cache_path: Optional[str] = None):
+        """
+        Args:
+            keep_raw_results: Retain each evaluation's raw search results (metrics only need the scores)
+            k: Cutoff whose relevance metrics are maintained incrementally as results are added
+            score_cache_path: SQLite file persisting (query, result) relevance scores across runs
+        """
+        self.keep_raw_results = keep_raw_results
+        self.k = k
+        # 1/log2(i+2) discount for each of the top-K positions (0-based i)
+        self._discounts = (1.0 / np.log2(np.arange(2, k + 2))).tolist()
+        # Question-type specific scorers, resolved once per question instead of per result
+        self._scorers = {
+            "Exact word": self._score_exact_word,
+            "Price range": self._score_price_range,
+            "Category": self._score_category,
+            "Attribute value": self._score_attribute,
+            "Description": self._score_description
+        }
+        # Optional persistent score cache; searches are added from several threads
+        self._score_cache = None
+        self._score_cache_lock = threading.Lock()
+        # Searches are recorded from ThreadPoolExecutor workers; guards evaluations and the running sums
+        self._metrics_lock = threading.Lock()
+        if score_cache_path:
+            self._score_cache = sqlite3.connect(score_cache_path, check_same_thread=False)
+            # WAL with synchronous=NORMAL makes the per-search commit an append without an fsync
+            self._score_cache.execute("PRAGMA journal_mode=WAL")
+            self._score_cache.execute("PRAGMA synchronous=NORMAL")
+            self._score_cache.execute(
+                "CREATE TABLE IF NOT EXISTS relevance_scores "
+                "(qkey TEXT, dkey TEXT, score INTEGER, PRIMARY KEY (qkey, dkey)) WITHOUT ROWID"
+            )
+            self._score_cache.commit()
         self.reset_metrics()
     
     def reset_metrics(self):
@@ -22,6 +190,14 @@ class SearchEvaluator:
         self.evaluations = []
         self.query_results = []
         self.relevance_judgments = {}
+        # Per-question-type metric averages by K, rebuilt after new evaluations are added
+        self._metrics_cache = {}
+        self._last_k = self.k
+        # Running metric sums per question type (and 'overall') at self.k, updated on every add
+        self._accum = defaultdict(lambda: {**dict.fromkeys(RELEVANCE_METRICS, 0.0), 'n': 0})
+        # Evaluations record a monotonic ms offset from this base instead of a formatted timestamp
+        self._t0 = time.time()
+        self._mono0 = time.monotonic()
         
     def add_search_result(self, 
                          question_data: Dict[str, Any], 
@@ -40,7 +216,43 @@ class SearchEvaluator:
         
         # Calculate relevance for each result
         relevance_scores = self._calculate_relevance_scores(question_data, search_results)
+        self._record_evaluation(question_data, search_results, relevance_scores, response_time_ms, success)
+    
+    def add_search_results(self, items: List[Tuple[Dict[str, Any], List[Dict], float, bool]], workers: int = 1):
+        """
+        Add many search results, scoring them across worker processes
         
+        Args:
+            items: (question_data, search_results, response_time_ms, success) tuples
+            workers: Scoring processes; 1 scores in this process
+        """
+        if workers <= 1 or len(items) < 2 * workers:
+            for question_data, search_results, response_time_ms, success in items:
+                self.add_search_result(question_data, search_results, response_time_ms, success)
+            return
+        
+        # With a score cache, lookups and inserts stay in this process and the workers only score
+        # the results that are not cached yet
+        lookups = [None] * len(items)
+        jobs = []
+        for i, (question_data, search_results, _, _) in enumerate(items):
+            if self._score_cache is not None and search_results:
+                lookups[i] = self._cache_lookup(self._build_query_context(question_data), search_results)
+                search_results = [search_results[j] for j in lookups[i][3]]
+            jobs.append((question_data, search_results))
+        
+        # Scoring is independent per query, so each worker scores a contiguous chunk of the batch
+        with multiprocessing.get_context("spawn").Pool(workers) as pool:
+            all_scores = pool.map(_score_query, jobs, chunksize=-(-len(items) // (workers * 4)))
+        for (question_data, search_results, response_time_ms, success), lookup, relevance_scores in zip(
+                items, lookups, all_scores):
+            if lookup is not None:
+                relevance_scores = self._cache_fill(lookup, relevance_scores)
+            self._record_evaluation(question_data, search_results, relevance_scores, response_time_ms, success)
+    
+    def _record_evaluation(self, question_data: Dict[str, Any], search_results: List[Dict],
+                           relevance_scores: np.ndarray, response_time_ms: float, success: bool):
+        """Store one scored search and update the running metrics"""
         evaluation = {
             'question': question_data.get('question', ''),
             'question_type': question_data.get('question_type', ''),
@@ -51,17 +263,45 @@ class SearchEvaluator:
                 'category': question_data.get('original_product_category', ''),
                 'attributes': question_data.get('original_product_attributes', [])
             },
-            'search_results': search_results,
+            'search_results': search_results if self.keep_raw_results else None,
             'relevance_scores': relevance_scores,
             'response_time_ms': response_time_ms,
             'success': success,
-            'timestamp': datetime.now().isoformat(),
+            'ts_offset_ms': int((time.monotonic() - self._mono0) * 1000),
             'results_count': len(search_results) if search_results else 0
         }
         
-        self.evaluations.append(evaluation)
+        metrics = self._query_metrics(relevance_scores) if success and len(relevance_scores) > 0 else None
+        with self._metrics_lock:
+            self.evaluations.append(evaluation)
+            self._metrics_cache.clear()
+            if metrics is not None:
+                self._accumulate_metrics(evaluation['question_type'], metrics)
+    
+    def _accumulate_metrics(self, question_type: str, metrics: Dict[str, float]):
+        """Add one query's metrics to the running sums (caller holds _metrics_lock)"""
+        for key in (question_type, 'overall'):
+            accum = self._accum[key]
+            for name, value in metrics.items():
+                accum[name] += value
+            accum['n'] += 1
+    
+    def _query_metrics(self, relevance_scores: np.ndarray) -> Dict[str, float]:
+        """One query's P@K, R@K, NDCG@K, AP and RR at self.k"""
+        # A single ranking is a few dozen scores, where plain lists beat NumPy call overhead
+        scores = relevance_scores.tolist()
+        top = scores[:self.k]
+        # The ideal ranking is the best K of all results, not a reordering of the returned top K
+        idcg = sum(map(mul, heapq.nlargest(self.k, scores), self._discounts))
+        return {
+            'precision': sum(1 for score in top if score >= 2) / len(top),
+            'recall': min(1.0, sum(1 for score in top if score >= 3)),
+            'ndcg': sum(map(mul, top, self._discounts)) / idcg if idcg > 0 else 0.0,
+            'average_precision': _average_precision_kernel(relevance_scores),
+            'reciprocal_rank': _reciprocal_rank_kernel(relevance_scores)
+        }
         
-    def _calculate_relevance_scores(self, question_data: Dict, search_results: List[Dict]) -> List[int]:
+    def _calculate_relevance_scores(self, question_data: Dict, search_results: List[Dict]) -> np.ndarray:
         """
         Calculate relevance scores (0-3) for each search result
         
@@ -72,140 +312,330 @@ class SearchEvaluator:
         3 = Highly relevant (exact or very close match)
         
         Returns:
-            List of relevance scores corresponding to search results
+            int8 array of relevance scores corresponding to search results
         """
         if not search_results:
-            return []
-            
-        relevance_scores = []
-        original_name = question_data.get('original_product_name', '').lower()
-        original_category = question_data.get('original_product_category', '').lower()
-        original_price = question_data.get('original_product_price', 0.0)
-        original_attributes = question_data.get('original_product_attributes', [])
+            return np.zeros(0, dtype=np.int8)
+        
+        # Lowercase/tokenize the question once, and each result once, before scoring
+        query = self._build_query_context(question_data)
+        scorer = self._scorers.get(query['question_type'], self._score_default)
+        if self._score_cache is None:
+            return self._score_batch(query, search_results, scorer)
+        return self._score_batch_cached(query, search_results, scorer)
+    
+    @staticmethod
+    def _cache_key(*fields) -> str:
+        """Stable key for the score cache (Python's hash() is randomized per process)"""
+        return hashlib.blake2b(json.dumps(fields, default=str).encode('utf-8'), digest_size=16).hexdigest()
+    
+    def _score_batch_cached(self, query: Dict[str, Any], search_results: List[Dict], scorer) -> np.ndarray:
+        """_score_batch backed by the SQLite cache: only results not scored before for this query are scored"""
+        lookup = self._cache_lookup(query, search_results)
+        missing = lookup[3]
+        new_scores = self._score_batch(query, [search_results[i] for i in missing], scorer) if missing else ()
+        return self._cache_fill(lookup, new_scores)
+    
+    def _cache_lookup(self, query: Dict[str, Any], search_results: List[Dict]):
+        """(qkey, dkeys, cached scores by dkey, indexes of results with no cached score)"""
+        qkey = self._cache_key(SCORE_CACHE_VERSION, query['question_type'], query['q_lc'], query['name_lc'],
+                               query['cat_lc'], query['price'], sorted(query['attr_vals']))
+        # Every scored field is part of the result key, so a product edited since the last run is rescored
+        dkeys = [
+            self._cache_key(result.get('Id'), result.get('DisplayName'), result.get('Category'),
+                            result.get('Description'), result.get('Price'))
+            for result in search_results
+        ]
+        
+        with self._score_cache_lock:
+            cached = dict(self._score_cache.execute(
+                "SELECT dkey, score FROM relevance_scores WHERE qkey = ?", (qkey,)
+            ).fetchall())
+        
+        return qkey, dkeys, cached, [i for i, dkey in enumerate(dkeys) if dkey not in cached]
+    
+    def _cache_fill(self, lookup, new_scores) -> np.ndarray:
+        """Store the scores of a lookup's missing results and return the scores of all its results"""
+        qkey, dkeys, cached, missing = lookup
+        if missing:
+            rows = [(qkey, dkeys[i], int(score)) for i, score in zip(missing, new_scores)]
+            cached.update((dkey, score) for _, dkey, score in rows)
+            with self._score_cache_lock:
+                self._score_cache.executemany("INSERT OR IGNORE INTO relevance_scores VALUES (?, ?, ?)", rows)
+                self._score_cache.commit()
+        
+        return np.fromiter((cached[dkey] for dkey in dkeys), dtype=np.int8, count=len(dkeys))
+    
+    def _build_query_context(self, question_data: Dict) -> Dict[str, Any]:
+        """Precompute the lowercased question fields and word sets shared by every result"""
         question_type = question_data.get('question_type', '')
-        question_text = question_data.get('question', '').lower()
+        name_lc = question_data.get('original_product_name', '').lower()
+        q_lc = question_data.get('question', '').lower()
         
         # Extract attribute values for comparison
-        original_attr_values = set()
-        for attr in original_attributes:
-            if isinstance(attr, dict) and 'value' in attr:
-                original_attr_values.add(attr['value'].lower())
+        attr_vals = frozenset(
+            attr['value'].lower()
+            for attr in question_data.get('original_product_attributes', [])
+            if isinstance(attr, dict) and 'value' in attr
+        )
         
-        for result in search_results:
-            score = self._score_single_result(
-                result, original_name, original_category, original_price, 
-                original_attr_values, question_type, question_text
-            )
-            relevance_scores.append(score)
-            
-        return relevance_scores
-    
-    def _score_single_result(self, result: Dict, original_name: str, original_category: str, 
-                           original_price: float, original_attr_values: set, 
-                           question_type: str, question_text: str) -> int:
-        """Score a single search result based on relevance criteria"""
+        cat_lc = question_data.get('original_product_category', '').lower()
         
-        # Extract result information
-        result_name = result.get('DisplayName', '').lower()
-        result_category = result.get('Category', '').lower()
-        result_price = float(result.get('Price', 0.0))
-        result_description = result.get('Description', '').lower()
+        return {
+            'question_type': question_type,
+            'name_lc': name_lc,
+            'cat_lc': cat_lc,
+            'price': question_data.get('original_product_price', 0.0),
+            'attr_vals': attr_vals,
+            'q_lc': q_lc,
+            # Word sets are only built for the question types whose scoring compares words
+            'name_words': _tokenize(name_lc) if question_type == "Exact word" else None,
+            'q_words': _tokenize(q_lc) if question_type == "Description" else None,
+            'related_terms': _related_category_terms(cat_lc) if question_type == "Category" else (),
+            'attr_matcher': _build_attribute_matcher(attr_vals) if question_type == "Attribute value" else None
+        }
+    
+    @staticmethod
+    def _build_result_fields(result: Dict, query: Dict[str, Any], name_lc: str) -> Tuple:
+        """Lowercase one result's fields once: (name_lc, cat_lc, desc_lc, name_words, desc_words, price)"""
+        question_type = query['question_type']
+        # Only the attribute and description scorers read the (long) description
+        desc_lc = result.get('Description', '').lower() if question_type in _DESCRIPTION_SCORED_TYPES else ''
+        return (
+            name_lc,
+            result.get('Category', '').lower(),
+            desc_lc,
+            _tokenize(name_lc) if question_type == "Exact word" else None,
+            _tokenize(desc_lc) if question_type == "Description" else None,
+            float(result.get('Price', 0.0))
+        )
+    
+    def _score_batch(self, query: Dict[str, Any], search_results: List[Dict], scorer) -> np.ndarray:
+        """Score all results of one query (the per-result hot loop) into an int8 array"""
+        original_name = query['name_lc']
+        original_category = query['cat_lc']
+        # The Category scorer already grades ==/in against the category, so the boost can't raise it
+        boost_category = bool(original_category) and query['question_type'] != "Category"
+        build_fields = self._build_result_fields
+        scores = []
+        append = scores.append
         
-        score = 0
+        for result in search_results:
+            # Exact name match (highest score) needs only the name, so check it before the other fields
+            name_lc = result.get('DisplayName', '').lower()
+            if original_name and original_name in name_lc:
+                append(3)
+                continue
+            result = build_fields(result, query, name_lc)
+            
+            # Question type specific scoring
+            score = scorer(query, result)
+            
+            # Boost score for category match (unless already high)
+            if boost_category:
+                result_category = result[1]
+                if score < 3 and original_category == result_category:
+                    score = max(score, 2)
+                elif score < 2 and original_category in result_category:
+                    score = max(score, 1)
+            
+            append(min(score, 3))  # Cap at 3
         
-        # Exact name match (highest score)
-        if original_name and original_name in result_name:
+        return np.array(scores, dtype=np.int8)
+    
+    def _score_exact_word(self, query: Dict[str, Any], result: Tuple) -> int:
+        """Exact word questions: prioritize name similarity"""
+        name_words, result_words = query['name_words'], result[3]
+        if not self._similarity_above(name_words, result_words, 0.4):
+            return 0
+        similarity = self._word_set_similarity(name_words, result_words)
+        if similarity > 0.7:
             return 3
-            
-        # Question type specific scoring
-        if question_type == "Exact word":
-            # For exact word questions, prioritize name similarity
-            if self._calculate_text_similarity(original_name, result_name) > 0.7:
-                score = 3
-            elif self._calculate_text_similarity(original_name, result_name) > 0.4:
-                score = 2
-                
-        elif question_type == "Price range":
-            # For price questions, check if price is in reasonable range
-            if original_price > 0:
-                price_diff_ratio = abs(result_price - original_price) / original_price
-                if price_diff_ratio <= 0.1:  # Within 10%
-                    score = 3
-                elif price_diff_ratio <= 0.3:  # Within 30%
-                    score = 2
-                elif price_diff_ratio <= 0.5:  # Within 50%
-                    score = 1
-                    
-        elif question_type == "Category":
-            # For category questions, check category match
-            if original_category and original_category == result_category:
-                score = 3
-            elif original_category and original_category in result_category:
-                score = 2
-            elif self._has_related_category(original_category, result_category):
-                score = 1
-                
-        elif question_type == "Attribute value":
-            # For attribute questions, check if result has matching attributes
-            result_text = f"{result_name} {result_description}".lower()
+        if similarity > 0.4:
+            return 2
+        return 0
+    
+    def _score_price_range(self, query: Dict[str, Any], result: Tuple) -> int:
+        """Price questions: check if price is in reasonable range"""
+        original_price = query['price']
+        if original_price > 0:
+            price_diff_ratio = abs(result[5] - original_price) / original_price
+            if price_diff_ratio <= 0.1:  # Within 10%
+                return 3
+            if price_diff_ratio <= 0.3:  # Within 30%
+                return 2
+            if price_diff_ratio <= 0.5:  # Within 50%
+                return 1
+        return 0
+    
+    def _score_category(self, query: Dict[str, Any], result: Tuple) -> int:
+        """Category questions: check category match"""
+        original_category = query['cat_lc']
+        result_category = result[1]
+        if original_category and original_category == result_category:
+            return 3
+        if original_category and original_category in result_category:
+            return 2
+        if result_category and any(term in result_category for term in query['related_terms']):
+            return 1
+        return 0
+    
+    def _score_attribute(self, query: Dict[str, Any], result: Tuple) -> int:
+        """Attribute questions: check if result has matching attributes"""
+        original_attr_values = query['attr_vals']
+        result_text = f"{result[0]} {result[2]}"
+        matcher = query['attr_matcher']
+        if matcher is not None:
+            # One pass over the text finds every (possibly overlapping) attribute value;
+            # an empty value matches any text, as with the `in` test
+            matching_attrs = len({value for _, value in matcher.iter(result_text)}) + ('' in original_attr_values)
+        else:
             matching_attrs = sum(1 for attr_val in original_attr_values if attr_val in result_text)
-            if matching_attrs >= len(original_attr_values):
-                score = 3
-            elif matching_attrs > 0:
-                score = 2
-                
-        elif question_type == "Description":
-            # For description questions, check description similarity
-            if original_name and original_name in result_description:
-                score = 3
-            elif self._calculate_text_similarity(question_text, result_description) > 0.3:
-                score = 2
-            elif original_category and original_category in result_description:
-                score = 1
-        
-        # Boost score for category match (unless already high)
-        if score < 3 and original_category and original_category == result_category:
-            score = max(score, 2)
-        elif score < 2 and original_category and original_category in result_category:
-            score = max(score, 1)
-            
-        return min(score, 3)  # Cap at 3
+        if matching_attrs >= len(original_attr_values):
+            return 3
+        if matching_attrs > 0:
+            return 2
+        return 0
+    
+    def _score_description(self, query: Dict[str, Any], result: Tuple) -> int:
+        """Description questions: check description similarity"""
+        original_name = query['name_lc']
+        original_category = query['cat_lc']
+        result_description = result[2]
+        if original_name and original_name in result_description:
+            return 3
+        if self._similarity_above(query['q_words'], result[4], 0.3):
+            return 2
+        if original_category and original_category in result_description:
+            return 1
+        return 0
+    
+    @staticmethod
+    def _score_default(query: Dict[str, Any], result: Tuple) -> int:
+        """Other question types rely on the name and category checks alone"""
+        return 0
+    
+    @staticmethod
+    def _word_set_similarity(words1, words2) -> float:
+        """Jaccard similarity of two precomputed word sets (from _tokenize)"""
+        if len(words1) == 0 or len(words2) == 0:
+            return 0.0
+        return _jaccard_kernel(words1, words2)
+    
+    @staticmethod
+    def _similarity_above(words1, words2, threshold: float) -> bool:
+        """Whether the Jaccard similarity of two word sets (from _tokenize) exceeds threshold"""
+        if len(words1) == 0 or len(words2) == 0:
+            return False
+        len1, len2 = len(words1), len(words2)
+        # Jaccard is at most min/max of the set sizes, so skip the intersection when that fails
+        if min(len1, len2) / max(len1, len2) <= threshold:
+            return False
+        return _jaccard_kernel(words1, words2) > threshold
     
     def _calculate_text_similarity(self, text1: str, text2: str) -> float:
         """Calculate simple text similarity using common words"""
         if not text1 or not text2:
             return 0.0
-            
-        words1 = set(text1.lower().split())
-        words2 = set(text2.lower().split())
-        
-        if not words1 or not words2:
-            return 0.0
-            
-        intersection = words1.intersection(words2)
-        union = words1.union(words2)
-        
-        return len(intersection) / len(union) if union else 0.0
+        return self._word_set_similarity(_tokenize(text1.lower()), _tokenize(text2.lower()))
     
     def _has_related_category(self, cat1: str, cat2: str) -> bool:
         """Check if categories are related"""
         if not cat1 or not cat2:
             return False
-            
-        # Define category relationships
-        related_categories = {
-            'accessory': ['accessories', 'gear', 'equipment'],
-            'sleeping': ['camping', 'outdoor', 'rest'],
-            'clothing': ['apparel', 'wear', 'garment'],
-        }
+        cat2 = cat2.lower()
+        return any(term in cat2 for term in _related_category_terms(cat1.lower()))
+    
+    def get_evaluation_timestamp(self, eval_data: Dict[str, Any]) -> str:
+        """ISO timestamp of when an evaluation was added"""
+        return datetime.fromtimestamp(self._t0 + eval_data['ts_offset_ms'] / 1000).isoformat()
+    
+    def _compute_all_metrics(self, k: Optional[int] = None) -> Dict[str, Dict[str, float]]:
+        """
+        Compute P@K, R@K, NDCG@K, AP and RR averages in one pass over the evaluations
         
-        for main_cat, related in related_categories.items():
-            if main_cat in cat1.lower() and any(rel in cat2.lower() for rel in related):
-                return True
-            if main_cat in cat2.lower() and any(rel in cat1.lower() for rel in related):
-                return True
-                
-        return False
+        Returns:
+            {'precision', 'recall', 'ndcg', 'average_precision', 'reciprocal_rank'} ->
+            per-question-type and overall averages (AP and RR use the full ranking)
+        """
+        # MAP and MRR do not depend on K, so they reuse whichever K was computed last
+        k = self._last_k if k is None else k
+        self._last_k = k
+        with self._metrics_lock:
+            if k == self.k:
+                return {
+                    name: {q_type: accum[name] / accum['n'] for q_type, accum in self._accum.items()}
+                    for name in RELEVANCE_METRICS
+                }
+            
+            cached = self._metrics_cache.get(k)
+            if cached is not None:
+                return cached
+            
+            rows = [e for e in self.evaluations if e['success'] and len(e['relevance_scores']) > 0]
+            evaluation_count = len(self.evaluations)
+        scores = np.zeros((len(rows), k), dtype=np.int8)  # top-K scores, zero-padded
+        ideal_scores = np.zeros((len(rows), k), dtype=np.int8)  # K best scores of each ranking
+        lengths = np.empty(len(rows), dtype=np.int64)
+        average_precisions = np.empty(len(rows))
+        reciprocal_ranks = np.empty(len(rows))
+        for i, eval_data in enumerate(rows):
+            relevance_scores = eval_data['relevance_scores']
+            top = relevance_scores[:k]
+            scores[i, :len(top)] = top
+            ideal_scores[i, :len(top)] = _ideal_top_k(relevance_scores, k)
+            lengths[i] = len(top)
+            average_precisions[i] = _average_precision_kernel(relevance_scores)
+            reciprocal_ranks[i] = _reciprocal_rank_kernel(relevance_scores)
+        
+        # Score >= 2 is relevant; rankings shorter than K are divided by their length
+        precisions = np.count_nonzero(scores >= 2, axis=1) / lengths
+        # For test cases, we expect 1 highly relevant result (the original product), so cap at 1
+        recalls = np.minimum(1.0, np.count_nonzero(scores >= 3, axis=1))
+        
+        # Padding zeros add no gain, so every row can use the same K discounts
+        gains = scores.astype(np.float64)
+        discounts = 1.0 / np.log2(np.arange(2, k + 2))  # position i (0-based) -> 1/log2(i+2)
+        dcg = gains @ discounts
+        idcg = np.sort(ideal_scores, axis=1)[:, ::-1].astype(np.float64) @ discounts
+        ndcg = np.divide(dcg, idcg, out=np.zeros_like(dcg), where=idcg > 0)
+        
+        averages = self._mean_by_question_type(
+            np.array([e['question_type'] for e in rows], dtype=object),
+            {
+                'precision': precisions,
+                'recall': recalls,
+                'ndcg': ndcg,
+                'average_precision': average_precisions,
+                'reciprocal_rank': reciprocal_ranks
+            }
+        )
+        with self._metrics_lock:
+            # Only cache if no evaluation was added while these rows were being averaged
+            if len(self.evaluations) == evaluation_count:
+                self._metrics_cache[k] = averages
+        return averages
+    
+    @staticmethod
+    def _mean_by_question_type(question_types: np.ndarray,
+                               metrics: Dict[str, np.ndarray]) -> Dict[str, Dict[str, float]]:
+        """Per-question-type and overall means of each per-query metric (types in first-seen order)"""
+        if len(question_types) == 0:
+            return {name: {} for name in metrics}
+        types, first_index, inverse = np.unique(question_types, return_index=True, return_inverse=True)
+        counts = np.bincount(inverse)
+        order = np.argsort(first_index)
+        
+        averages = {}
+        for name, values in metrics.items():
+            means = np.bincount(inverse, weights=values) / counts
+            by_type = {}
+            for position, t in enumerate(order):
+                by_type[types[t]] = float(means[t])
+                if position == 0:
+                    by_type['overall'] = float(values.mean())
+            averages[name] = by_type
+        return averages
     
     def calculate_precision_at_k(self, k: int = 10) -> Dict[str, float]:
         """
@@ -213,27 +643,7 @@ class SearchEvaluator:
         
         Formula: P@K = (Relevant items in top K) / K
         """
-        precisions = defaultdict(list)
-        
-        for eval_data in self.evaluations:
-            if not eval_data['success'] or not eval_data['relevance_scores']:
-                continue
-                
-            relevance_scores = eval_data['relevance_scores'][:k]
-            relevant_count = sum(1 for score in relevance_scores if score >= 2)  # Score >= 2 is relevant
-            
-            precision = relevant_count / min(k, len(relevance_scores)) if relevance_scores else 0.0
-            
-            question_type = eval_data['question_type']
-            precisions[question_type].append(precision)
-            precisions['overall'].append(precision)
-        
-        # Calculate average precisions
-        avg_precisions = {}
-        for q_type, prec_list in precisions.items():
-            avg_precisions[q_type] = statistics.mean(prec_list) if prec_list else 0.0
-            
-        return avg_precisions
+        return dict(self._compute_all_metrics(k)['precision'])
     
     def calculate_recall_at_k(self, k: int = 10) -> Dict[str, float]:
         """
@@ -242,28 +652,7 @@ class SearchEvaluator:
         Formula: R@K = (Relevant items in top K) / (Total relevant items)
         Note: For our test cases, we assume 1 perfect match per query
         """
-        recalls = defaultdict(list)
-        
-        for eval_data in self.evaluations:
-            if not eval_data['success'] or not eval_data['relevance_scores']:
-                continue
-                
-            relevance_scores = eval_data['relevance_scores'][:k]
-            # For test cases, we expect 1 highly relevant result (the original product)
-            highly_relevant_found = sum(1 for score in relevance_scores if score >= 3)
-            
-            recall = min(1.0, highly_relevant_found)  # Cap at 1.0 since we expect 1 perfect match
-            
-            question_type = eval_data['question_type']
-            recalls[question_type].append(recall)
-            recalls['overall'].append(recall)
-        
-        # Calculate average recalls
-        avg_recalls = {}
-        for q_type, recall_list in recalls.items():
-            avg_recalls[q_type] = statistics.mean(recall_list) if recall_list else 0.0
-            
-        return avg_recalls
+        return dict(self._compute_all_metrics(k)['recall'])
     
     def calculate_f1_scores(self, k: int = 10) -> Dict[str, float]:
         """
@@ -290,40 +679,7 @@ class SearchEvaluator:
         Formula: MAP = (1/Q) * Σ(AP_q) where AP_q is Average Precision for query q
         AP_q = (1/R) * Σ(P@k * rel(k)) where R is total relevant docs
         """
-        average_precisions = defaultdict(list)
-        
-        for eval_data in self.evaluations:
-            if not eval_data['success'] or not eval_data['relevance_scores']:
-                continue
-                
-            relevance_scores = eval_data['relevance_scores']
-            
-            # Calculate Average Precision for this query
-            relevant_count = 0
-            precision_sum = 0.0
-            total_relevant = sum(1 for score in relevance_scores if score >= 2)
-            
-            if total_relevant == 0:
-                ap = 0.0
-            else:
-                for i, score in enumerate(relevance_scores):
-                    if score >= 2:  # Relevant
-                        relevant_count += 1
-                        precision_at_i = relevant_count / (i + 1)
-                        precision_sum += precision_at_i
-                
-                ap = precision_sum / total_relevant
-            
-            question_type = eval_data['question_type']
-            average_precisions[question_type].append(ap)
-            average_precisions['overall'].append(ap)
-        
-        # Calculate MAP for each question type
-        map_scores = {}
-        for q_type, ap_list in average_precisions.items():
-            map_scores[q_type] = statistics.mean(ap_list) if ap_list else 0.0
-            
-        return map_scores
+        return dict(self._compute_all_metrics()['average_precision'])
     
     def calculate_ndcg(self, k: int = 10) -> Dict[str, float]:
         """
@@ -333,37 +689,7 @@ class SearchEvaluator:
         DCG@K = Σ(rel_i / log2(i+1)) for i=1 to K
         IDCG@K = DCG of perfect ranking
         """
-        ndcg_scores = defaultdict(list)
-        
-        for eval_data in self.evaluations:
-            if not eval_data['success'] or not eval_data['relevance_scores']:
-                continue
-                
-            relevance_scores = eval_data['relevance_scores'][:k]
-            
-            # Calculate DCG
-            dcg = 0.0
-            for i, score in enumerate(relevance_scores):
-                dcg += score / math.log2(i + 2)  # i+2 because log2(1) = 0
-            
-            # Calculate IDCG (perfect ranking)
-            ideal_scores = sorted(relevance_scores, reverse=True)
-            idcg = 0.0
-            for i, score in enumerate(ideal_scores):
-                idcg += score / math.log2(i + 2)
-            
-            ndcg = dcg / idcg if idcg > 0 else 0.0
-            
-            question_type = eval_data['question_type']
-            ndcg_scores[question_type].append(ndcg)
-            ndcg_scores['overall'].append(ndcg)
-        
-        # Calculate average NDCG for each question type
-        avg_ndcg = {}
-        for q_type, ndcg_list in ndcg_scores.items():
-            avg_ndcg[q_type] = statistics.mean(ndcg_list) if ndcg_list else 0.0
-            
-        return avg_ndcg
+        return dict(self._compute_all_metrics(k)['ndcg'])
     
     def calculate_mrr(self) -> Dict[str, float]:
         """
@@ -371,64 +697,32 @@ class SearchEvaluator:
         
         Formula: MRR = (1/Q) * Σ(1/rank_i) where rank_i is rank of first relevant result
         """
-        reciprocal_ranks = defaultdict(list)
-        
-        for eval_data in self.evaluations:
-            if not eval_data['success'] or not eval_data['relevance_scores']:
-                continue
-                
-            relevance_scores = eval_data['relevance_scores']
-            
-            # Find rank of first relevant result (score >= 2)
-            first_relevant_rank = None
-            for i, score in enumerate(relevance_scores):
-                if score >= 2:
-                    first_relevant_rank = i + 1  # 1-indexed
-                    break
-            
-            rr = 1.0 / first_relevant_rank if first_relevant_rank else 0.0
-            
-            question_type = eval_data['question_type']
-            reciprocal_ranks[question_type].append(rr)
-            reciprocal_ranks['overall'].append(rr)
-        
-        # Calculate MRR for each question type
-        mrr_scores = {}
-        for q_type, rr_list in reciprocal_ranks.items():
-            mrr_scores[q_type] = statistics.mean(rr_list) if rr_list else 0.0
-            
-        return mrr_scores
-    
-    def calculate_percentile(self, data: List[float], percentile: int) -> float:
-        """Calculate percentile without numpy"""
-        if not data:
-            return 0.0
-        
-        sorted_data = sorted(data)
-        n = len(sorted_data)
-        k = (percentile / 100) * (n - 1)
-        
-        if k == int(k):
-            return sorted_data[int(k)]
-        else:
-            lower = sorted_data[int(k)]
-            upper = sorted_data[int(k) + 1]
-            return lower + (k - int(k)) * (upper - lower)
+        return dict(self._compute_all_metrics()['reciprocal_rank'])
     
     def calculate_performance_metrics(self) -> Dict[str, Any]:
         """Calculate response time and throughput metrics"""
         if not self.evaluations:
             return {}
             
-        response_times = [eval_data['response_time_ms'] for eval_data in self.evaluations if eval_data['success']]
-        success_count = sum(1 for eval_data in self.evaluations if eval_data['success'])
+        response_times = np.fromiter(
+            (eval_data['response_time_ms'] for eval_data in self.evaluations if eval_data['success']),
+            dtype=np.float64
+        )
+        success_count = len(response_times)
         total_count = len(self.evaluations)
         
+        # Median, P95 and P99 from a single sort (linear interpolation between ranks)
+        if success_count:
+            median, p95, p99 = np.percentile(response_times, [50, 95, 99])
+            average = response_times.mean()
+        else:
+            median = p95 = p99 = average = 0.0
+        
         return {
-            'average_response_time_ms': statistics.mean(response_times) if response_times else 0.0,
-            'median_response_time_ms': statistics.median(response_times) if response_times else 0.0,
-            'p95_response_time_ms': self.calculate_percentile(response_times, 95) if response_times else 0.0,
-            'p99_response_time_ms': self.calculate_percentile(response_times, 99) if response_times else 0.0,
+            'average_response_time_ms': float(average),
+            'median_response_time_ms': float(median),
+            'p95_response_time_ms': float(p95),
+            'p99_response_time_ms': float(p99),
             'success_rate': success_count / total_count if total_count > 0 else 0.0,
             'total_queries': total_count,
             'successful_queries': success_count,
@@ -486,8 +780,12 @@ class SearchEvaluator:
         """Save comprehensive evaluation report to file"""
         report = self.generate_comprehensive_report(k)
         
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(report, f, indent=2, ensure_ascii=False)
+        if orjson:
+            with open(output_file, 'wb') as f:
+                f.write(orjson.dumps(report, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+        else:
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
         
         print(f"📊 Evaluation report saved to: {output_file}")
         return report
@@ -561,3 +859,14 @@ class SearchEvaluator:
         print("   Question Type 'Attribute value': Attribute value presence in result")
         print("   Question Type 'Description': Description and content similarity")
         print("=" * 80)
+
+
+_worker_evaluator = None
+
+def _score_query(args):
+    """Score one (question_data, search_results) pair in a worker process"""
+    global _worker_evaluator
+    if _worker_evaluator is None:
+        _worker_evaluator = SearchEvaluator()
+    question_data, search_results = args
+    return _worker_evaluator._calculate_relevance_scores(question_data, search_results)
@@ -4,9 +4,86 @@ Simplified Relevance Scoring Logic based on clear 100% relevance criteria
 """
 
 import re
+import sys
 import json
-from typing import Dict, List, Set, Tuple, Any, Union
+import logging
+import multiprocessing
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Tuple, Any, Union
 from collections import defaultdict
+from functools import lru_cache
+
+try:
+    import ahocorasick  # optional multi-pattern matcher for category keyword scans
+except ImportError:
+    ahocorasick = None
+
+# Under PyPy, C-extension calls go through the slow cpyext layer while the JIT compiles the plain
+# substring loops well, so the automaton is only used on CPython
+if sys.implementation.name == 'pypy':
+    ahocorasick = None
+
+# Scoring errors are reported here (handlers are left to the application); only the first
+# _MAX_LOGGED_ERRORS per scorer are logged so a run over malformed results does not drown in tracebacks
+logger = logging.getLogger(__name__)
+_MAX_LOGGED_ERRORS = 20
+
+# Patterns used on every scoring call, compiled once at import
+_NAME_FIELD_RE = re.compile(r'Name[:\s]*([^,\n]+)', re.IGNORECASE)
+_PRICE_FIELD_RE = re.compile(r'Price[:\s]*\$?([\d.]+)', re.IGNORECASE)
+_PUNCT_RE = re.compile(r'[^\w\s]')
+
+# Every price phrase in one alternation, scanned once per question. Alternatives are tried in
+# order at each position and matches never overlap, so the "$50" inside "under $50" or
+# "$100 to $200" is not also read as an exact price.
+_PRICE_PHRASE_RE = re.compile(r"""
+    \$(?P<range_lo>\d+(?:\.\d+)?)\s*(?:to|-)\s*\$?(?P<range_hi>\d+(?:\.\d+)?)       # "$100 to $200", "$100-$200"
+  | between\s+\$?(?P<between_lo>\d+(?:\.\d+)?)\s+and\s+\$?(?P<between_hi>\d+(?:\.\d+)?)
+  | (?:under|less\s+than)\s+\$?(?P<under>\d+(?:\.\d+)?)                            # "under $50" → $0-$50
+  | (?:over|more\s+than)\s+\$?(?P<over>\d+(?:\.\d+)?)
+  | around\s+\$?(?P<around>\d+(?:\.\d+)?)
+  | \$(?P<exact>\d+(?:\.\d+)?)
+""", re.IGNORECASE | re.VERBOSE)
+
+# Question fields prepare_question() reads (plus the attribute values); its last parse is reused
+# only while all of them are unchanged, so a question dict edited in place is parsed again
+_QUESTION_KEY_FIELDS = ('question', 'question_type', 'original_product_name',
+                        'original_product_category', 'original_product_price')
+
+def _question_key(question_data: Dict) -> Tuple:
+    """Snapshot of the question fields prepare_question() reads"""
+    attribute_values = tuple(
+        (attr.get('value'), attr.get('Value')) if isinstance(attr, dict) else None
+        for attr in question_data.get('original_product_attributes') or ()
+    )
+    return tuple(question_data.get(field) for field in _QUESTION_KEY_FIELDS) + (attribute_values,)
+
+# The same products come back for many questions, so result texts are tokenized once per run
+# and every later question reuses the cached word sets
+@lru_cache(maxsize=8192)
+def _word_set(text: str) -> FrozenSet[str]:
+    """Whitespace-separated words of text"""
+    return frozenset(text.split())
+
+@lru_cache(maxsize=8192)
+def _meaningful_word_set(text: str, stop_words: FrozenSet[str]) -> FrozenSet[str]:
+    """Words of (lowercased) text longer than two characters, without punctuation or stop words"""
+    return frozenset(word for word in _PUNCT_RE.sub(' ', text).split()
+                     if len(word) > 2 and word not in stop_words)
+
+@dataclass(slots=True, frozen=True)
+class QuestionFeatures:
+    """Everything the scorers need from one question, parsed once and reused for all its results"""
+    question_type: str
+    question_text: str
+    product_name: str
+    product_words: FrozenSet[str]
+    category: str
+    price: float
+    attributes: Tuple[str, ...]
+    price_ranges: Tuple[Tuple[float, float], ...]
+    meaningful_words: FrozenSet[str]
+    scorable: bool  # False when the field this question type is scored on is empty: every result scores 0
 
 class SimplifiedRelevanceScorer:
     """
@@ -26,68 +103,184 @@ class SimplifiedRelevanceScorer:
     5. Category + Attribute – Result category matches AND contains mentioned attributes → 1.0
     """
     
+    # Keyword tables are shared by every instance; keyword groups are frozensets for O(1) membership
+    category_mappings = {
+        'clothing': frozenset({'clothing', 'apparel', 'wear', 'garment', 'shirt', 'jacket', 'coat', 'sweater', 'hoodie', 'vest'}),
+        'footwear': frozenset({'footwear', 'shoes', 'boots', 'sneakers', 'sandals', 'shoe', 'boot'}),
+        'bike': frozenset({'bike', 'bicycle', 'cycling', 'cycle'}),
+        'accessory': frozenset({'accessory', 'accessories', 'gear', 'equipment'}),
+        'backpack': frozenset({'backpack', 'pack', 'bag', 'rucksack'}),
+        'helmet': frozenset({'helmet', 'head protection'}),
+        'tent': frozenset({'tent', 'shelter', 'camping'}),
+        'gloves': frozenset({'gloves', 'glove', 'hand protection'}),
+        'shorts_pants': frozenset({'shorts', 'pants', 'trousers', 'short', 'pant'}),
+        'hat': frozenset({'hat', 'cap', 'beanie'}),
+        'sleeping': frozenset({'sleeping', 'sleep', 'bag'})
+    }
+    
+    # Common attribute keywords for matching
+    attribute_keywords = {
+        'color': frozenset({'color', 'colour', 'black', 'white', 'red', 'blue', 'green', 'yellow', 'orange', 'purple', 'pink', 'brown', 'gray', 'grey'}),
+        'size': frozenset({'size', 'small', 'medium', 'large', 'xl', 'xxl', 's', 'm', 'l'}),
+        'material': frozenset({'material', 'cotton', 'polyester', 'wool', 'leather', 'synthetic', 'fabric', 'nylon'}),
+        'style': frozenset({'style', 'casual', 'formal', 'sport', 'athletic', 'outdoor'}),
+        'features': frozenset({'waterproof', 'breathable', 'insulated', 'lightweight', 'durable'})
+    }
+    _attribute_words = frozenset().union(*attribute_keywords.values())
+    
+    # Result price fields, in priority order
+    _price_fields = ('Price', 'cr4a3_price', 'ListPrice', 'BasePrice')
+    
+    # Stop words for text processing
+    stop_words = frozenset({
+        'i', 'me', 'my', 'we', 'our', 'you', 'your', 'he', 'him', 'his', 'she', 'her',
+        'it', 'its', 'they', 'them', 'their', 'what', 'which', 'who', 'whom', 'this',
+        'that', 'these', 'those', 'am', 'is', 'are', 'was', 'were', 'be', 'been', 'being',
+        'have', 'has', 'had', 'having', 'do', 'does', 'did', 'doing', 'a', 'an', 'the',
+        'and', 'but', 'if', 'or', 'because', 'as', 'until', 'while', 'of', 'at', 'by',
+        'for', 'with', 'about', 'against', 'between', 'into', 'through', 'during',
+        'before', 'after', 'above', 'below', 'up', 'down', 'in', 'out', 'on', 'off',
+        'over', 'under', 'again', 'further', 'then', 'once', 'here', 'there', 'when',
+        'where', 'why', 'how', 'all', 'any', 'both', 'each', 'few', 'more', 'most',
+        'other', 'some', 'such', 'no', 'nor', 'not', 'only', 'own', 'same', 'so',
+        'than', 'too', 'very', 'can', 'will', 'just', 'should', 'now', 'good',
+        'things', 'compare', 'options', 'suggestions', 'opinion', 'considering',
+        'buying', 'worth', 'tell', 'heard', 'show', 'find', 'looking', 'need'
+    })
+    
+    # Only per-instance state is slotted; the keyword tables above stay shared class attributes
+    __slots__ = ('_category_automaton', '_last_question', '_error_count',
+                 '_category_keyword_hits', '_result_category', '_category_score', '_question_type_handlers')
+    
     def __init__(self):
-        # Define category mappings and synonyms
-        self.category_mappings = {
-            'clothing': ['clothing', 'apparel', 'wear', 'garment', 'shirt', 'jacket', 'coat', 'sweater', 'hoodie', 'vest'],
-            'footwear': ['footwear', 'shoes', 'boots', 'sneakers', 'sandals', 'shoe', 'boot'],
-            'bike': ['bike', 'bicycle', 'cycling', 'cycle'],
-            'accessory': ['accessory', 'accessories', 'gear', 'equipment'],
-            'backpack': ['backpack', 'pack', 'bag', 'rucksack'],
-            'helmet': ['helmet', 'head protection'],
-            'tent': ['tent', 'shelter', 'camping'],
-            'gloves': ['gloves', 'glove', 'hand protection'],
-            'shorts_pants': ['shorts', 'pants', 'trousers', 'short', 'pant'],
-            'hat': ['hat', 'cap', 'beanie'],
-            'sleeping': ['sleeping', 'sleep', 'bag']
+        # One automaton over every category keyword, so a result text is scanned once instead of
+        # once per keyword; None when pyahocorasick is missing (plain substring tests are used)
+        self._category_automaton = self._build_category_automaton()
+        self._last_question = (None, None)
+        self._error_count = 0
+        
+        # The same result texts come back for many questions: memoize the category work done on
+        # them, keyed on the text (and expected category for the score)
+        self._category_keyword_hits = lru_cache(maxsize=8192)(self._scan_category_keywords)
+        self._result_category = lru_cache(maxsize=8192)(self._extract_category_from_text)
+        self._category_score = lru_cache(maxsize=16384)(self._score_category_simplified)
+        
+        self._question_type_handlers = {
+            "Exact word": self._score_exact_word_result,
+            "Category": self._score_category_result,
+            "Category + Attribute value": self._score_category_attribute_result,
+            "Attribute value": self._score_category_attribute_result,
+            "Category + Price range": self._score_category_price_result,
+            "Price range": self._score_category_price_result,
+            "Description": self._score_description_result,
         }
+    
+    def _build_category_automaton(self):
+        """Aho-Corasick automaton over every category keyword"""
+        if ahocorasick is None:
+            return None
+        automaton = ahocorasick.Automaton()
+        for keywords in self.category_mappings.values():
+            for keyword in keywords:
+                automaton.add_word(keyword, keyword)
+        automaton.make_automaton()
+        return automaton
+    
+    def _scan_category_keywords(self, text: str) -> FrozenSet[str]:
+        """Category keywords found in (lowercased) text, from one automaton pass"""
+        return frozenset(keyword for _, keyword in self._category_automaton.iter(text))
+    
+    def _count_category_keywords(self, category: str, text: str) -> int:
+        """
+        Number of distinct keywords of category (or the category name itself if unmapped) in text
         
-        # Common attribute keywords for matching
-        self.attribute_keywords = {
-            'color': ['color', 'colour', 'black', 'white', 'red', 'blue', 'green', 'yellow', 'orange', 'purple', 'pink', 'brown', 'gray', 'grey'],
-            'size': ['size', 'small', 'medium', 'large', 'xl', 'xxl', 's', 'm', 'l'],
-            'material': ['material', 'cotton', 'polyester', 'wool', 'leather', 'synthetic', 'fabric', 'nylon'],
-            'style': ['style', 'casual', 'formal', 'sport', 'athletic', 'outdoor'],
-            'features': ['waterproof', 'breathable', 'insulated', 'lightweight', 'durable']
-        }
-
-        # Stop words for text processing
-        self.stop_words = {
-            'i', 'me', 'my', 'we', 'our', 'you', 'your', 'he', 'him', 'his', 'she', 'her',
-            'it', 'its', 'they', 'them', 'their', 'what', 'which', 'who', 'whom', 'this',
-            'that', 'these', 'those', 'am', 'is', 'are', 'was', 'were', 'be', 'been', 'being',
-            'have', 'has', 'had', 'having', 'do', 'does', 'did', 'doing', 'a', 'an', 'the',
-            'and', 'but', 'if', 'or', 'because', 'as', 'until', 'while', 'of', 'at', 'by',
-            'for', 'with', 'about', 'against', 'between', 'into', 'through', 'during',
-            'before', 'after', 'above', 'below', 'up', 'down', 'in', 'out', 'on', 'off',
-            'over', 'under', 'again', 'further', 'then', 'once', 'here', 'there', 'when',
-            'where', 'why', 'how', 'all', 'any', 'both', 'each', 'few', 'more', 'most',
-            'other', 'some', 'such', 'no', 'nor', 'not', 'only', 'own', 'same', 'so',
-            'than', 'too', 'very', 'can', 'will', 'just', 'should', 'now', 'good',
-            'things', 'compare', 'options', 'suggestions', 'opinion', 'considering',
-            'buying', 'worth', 'tell', 'heard', 'show', 'find', 'looking', 'need'
-        }
+        Callers only distinguish 0, 1 and 2+, so the substring scan stops at the second keyword found.
+        """
+        keywords = self.category_mappings.get(category)
+        if keywords is None:
+            return int(category in text)
+        if self._category_automaton is not None:
+            return len(keywords & self._category_keyword_hits(text))
+        
+        found_keywords = 0
+        for keyword in keywords:
+            if keyword in text:
+                found_keywords += 1
+                if found_keywords >= 2:
+                    break
+        return found_keywords
+    
+    def prepare_question(self, question_data: Dict) -> QuestionFeatures:
+        """Parse a question's context once; pass the result to score_result_relevance for each of its results"""
+        question_text = (question_data.get('question') or '').lower()
+        product_name = (question_data.get('original_product_name') or '').lower()
+        
+        # Attribute values to check: the product's own, then those mentioned in the question
+        attributes = []
+        for attr in question_data.get('original_product_attributes') or []:
+            if isinstance(attr, dict):
+                attr_value = attr.get('value', attr.get('Value', ''))
+                if attr_value:
+                    attributes.append(attr_value.lower())
+        question_attributes, meaningful_words = self._classify_question_words(question_text)
+        attributes.extend(question_attributes)
+        
+        question_type = (question_data.get('question_type') or '').strip()
+        product_words = frozenset(product_name.split())
+        category = (question_data.get('original_product_category') or '').lower()
+        
+        # The field each handler bails out on when empty (category for the category-based types)
+        if question_type == "Exact word":
+            scorable = bool(product_words)
+        elif question_type == "Description":
+            scorable = bool(meaningful_words)
+        elif question_type in self._question_type_handlers:
+            scorable = bool(category)
+        else:
+            scorable = bool(product_words or category)
+        
+        return QuestionFeatures(
+            question_type=question_type,
+            question_text=question_text,
+            product_name=product_name,
+            product_words=product_words,
+            category=category,
+            price=question_data.get('original_product_price') or 0.0,
+            attributes=tuple(attributes),
+            price_ranges=tuple(self._extract_price_ranges_from_question(question_text)),
+            meaningful_words=meaningful_words,
+            scorable=scorable
+        )
+    
+    def _question_features(self, question_data: Union[Dict, QuestionFeatures]) -> QuestionFeatures:
+        """Features for question_data, reusing the last parse while results of the same question are scored"""
+        if isinstance(question_data, QuestionFeatures):
+            return question_data
+        # Keyed on the parsed fields rather than the dict's identity: callers may reuse one dict
+        key = _question_key(question_data)
+        last_key, last_features = self._last_question
+        if key != last_key:
+            last_features = self.prepare_question(question_data)
+            self._last_question = (key, last_features)
+        return last_features
     
-    def score_result_relevance(self, result: Union[Dict, str], question_data: Dict, 
+    def score_result_relevance(self, result: Union[Dict, str], question_data: Union[Dict, QuestionFeatures],
                              result_format: str = 'dataverse') -> int:
         """
         Score a single search result based on simplified 100% relevance criteria
         
         Args:
             result: Search result (Dict for dataverse, str for agentic parsed product)
-            question_data: Original question data with context
+            question_data: Original question data with context, or its prepare_question() features
             result_format: 'dataverse' or 'agentic' to handle different formats
             
         Returns:
             Relevance score: 0, 1, 2, or 3 (will be converted to 0.0, 0.33, 0.67, 1.0)
         """
         try:
-            question_type = question_data.get('question_type', '').strip()
-            question_text = question_data.get('question', '').lower()
-            expected_product_name = question_data.get('original_product_name', '').lower()
-            expected_category = question_data.get('original_product_category', '').lower()
-            expected_price = question_data.get('original_product_price', 0.0)
-            expected_attributes = question_data.get('original_product_attributes', [])
+            question = self._question_features(question_data)
+            if not question.scorable:
+                return 0  # nothing to match results against: skip parsing them
             
             # Extract result information based on format
             if result_format == 'agentic':
@@ -95,56 +288,70 @@ class SimplifiedRelevanceScorer:
             else:
                 result_name, result_price, result_text = self._parse_dataverse_result(result)
             
-            result_category = self._extract_category_from_text(result_text)
-            
-            # Route to specific scoring method based on question type
-            if question_type == "Exact word":
-                return self._score_exact_word_simplified(expected_product_name, result_name, result_text)
-            
-            elif question_type == "Category":
-                return self._score_category_simplified(expected_category, result_category, result_text)
-            
-            elif question_type in ["Category + Attribute value", "Attribute value"]:
-                return self._score_category_attribute_simplified(expected_category, expected_attributes, 
-                                                    result_category, result_text, question_text)
-            
-            elif question_type in ["Category + Price range", "Price range"]:
-                return self._score_category_price_simplified(expected_category, expected_price, 
-                                                result_category, result_price, question_text, result_text)
-            
-            elif question_type == "Description":
-                return self._score_description_simplified(question_text, result_text)
-            
-            else:
-                # Fallback for unknown question types
-                return self._score_general_relevance(expected_product_name, expected_category,
-                                                   result_name, result_category, result_text)
+            # Route to specific scoring method based on question type (one dict lookup)
+            handler = self._question_type_handlers.get(question.question_type, self._score_general_result)
+            return handler(question, result_name, result_price, result_text)
         
         except Exception as e:
-            print(f"⚠️ Error scoring relevance: {e}")
+            self._error_count += 1
+            if self._error_count <= _MAX_LOGGED_ERRORS:
+                logger.exception(f"⚠️ Error scoring relevance: {e}")
+                if self._error_count == _MAX_LOGGED_ERRORS:
+                    logger.warning(f"⚠️ {_MAX_LOGGED_ERRORS} scoring errors logged; further ones are counted silently")
             return 0
     
-    def _score_exact_word_simplified(self, expected_product_name: str, result_name: str, result_text: str) -> int:
+    # Question-type handlers: each takes the question features and the parsed result fields
+    def _score_exact_word_result(self, question: QuestionFeatures, result_name: str,
+                                 result_price: float, result_text: str) -> int:
+        return self._score_exact_word_simplified(question.product_words, result_name, _word_set(result_text))
+    
+    def _score_category_result(self, question: QuestionFeatures, result_name: str,
+                               result_price: float, result_text: str) -> int:
+        return self._category_score(question.category, self._result_category(result_text), result_text)
+    
+    def _score_category_attribute_result(self, question: QuestionFeatures, result_name: str,
+                                         result_price: float, result_text: str) -> int:
+        category_score = self._score_category_result(question, result_name, result_price, result_text)
+        return self._score_category_attribute_simplified(category_score, question.attributes, result_text)
+    
+    def _score_category_price_result(self, question: QuestionFeatures, result_name: str,
+                                     result_price: float, result_text: str) -> int:
+        category_score = self._score_category_result(question, result_name, result_price, result_text)
+        return self._score_category_price_simplified(category_score, question.price,
+                                                     result_price, question.price_ranges)
+    
+    def _score_description_result(self, question: QuestionFeatures, result_name: str,
+                                  result_price: float, result_text: str) -> int:
+        return self._score_description_simplified(question.meaningful_words,
+                                                  self._extract_meaningful_words(result_text))
+    
+    def _score_general_result(self, question: QuestionFeatures, result_name: str,
+                              result_price: float, result_text: str) -> int:
+        # Fallback for unknown question types
+        return self._score_general_relevance(question.product_words, question.category, result_name,
+                                             self._result_category(result_text), _word_set(result_text),
+                                             result_text)
+    
+    def _score_exact_word_simplified(self, product_words: FrozenSet[str], result_name: str,
+                                     result_words: FrozenSet[str]) -> int:
         """
         Exact word scoring: 100% relevant if result contains the product name
         """
-        if not expected_product_name:
+        if not product_words:
             return 0
         
-        # Check if product name (or key parts) appears in result
-        product_words = set(expected_product_name.split())
-        result_words = set(result_text.split())
+        # Overlap between the product name words and the result words, counted once
+        meaningful_overlap = len(product_words & result_words)
         
         # If most of the product name words are found → 100% relevant
-        if product_words and len(product_words & result_words) >= len(product_words) * 0.7:
+        if meaningful_overlap >= len(product_words) * 0.7:
             return 3  # 100% relevant
         
         # If some product name words are found → partially relevant
-        if product_words and len(product_words & result_words) >= len(product_words) * 0.3:
+        if meaningful_overlap >= len(product_words) * 0.3:
             return 2  # 67% relevant
         
         # Check for any meaningful word overlap
-        meaningful_overlap = len(product_words & result_words)
         if meaningful_overlap > 0:
             return 1  # 33% relevant
         
@@ -162,12 +369,7 @@ class SimplifiedRelevanceScorer:
             return 3
         
         # Check category keywords in result text
-        expected_keywords = self.category_mappings.get(expected_category, [expected_category])
-        found_keywords = 0
-        
-        for keyword in expected_keywords:
-            if keyword in result_text:
-                found_keywords += 1
+        found_keywords = self._count_category_keywords(expected_category, result_text)
         
         # If main category keyword found → 100% relevant
         if expected_category in result_text or found_keywords >= 2:
@@ -179,31 +381,16 @@ class SimplifiedRelevanceScorer:
         
         return 0  # Not relevant
     
-    def _score_category_attribute_simplified(self, expected_category: str, expected_attributes: List[Dict],
-                                result_category: str, result_text: str, question_text: str) -> int:
+    def _score_category_attribute_simplified(self, category_score: int, attributes_to_check: Tuple[str, ...],
+                                result_text: str) -> int:
         """
         Category + Attribute scoring: 100% relevant if category matches AND contains mentioned attributes
-        """
-        # First check category match
-        category_score = self._score_category_simplified(expected_category, result_category, result_text)
         
+        category_score is the result's _score_category_simplified score, computed once by the caller.
+        """
         if category_score == 0:
             return 0  # Must have category relevance first
         
-        # Extract attribute values to check
-        attributes_to_check = []
-        
-        # From expected attributes
-        for attr in expected_attributes:
-            if isinstance(attr, dict):
-                attr_value = attr.get('value', attr.get('Value', ''))
-                if attr_value:
-                    attributes_to_check.append(attr_value.lower())
-        
-        # From question text (extract attribute mentions)
-        question_attributes = self._extract_attributes_from_question(question_text)
-        attributes_to_check.extend(question_attributes)
-        
         if not attributes_to_check:
             return category_score  # Return category score if no attributes to check
         
@@ -224,21 +411,16 @@ class SimplifiedRelevanceScorer:
         # If only category matches → return category score
         return min(category_score, 2)
     
-    def _score_category_price_simplified(self, expected_category: str, expected_price: float,
-                            result_category: str, result_price: float, 
-                            question_text: str, result_text: str) -> int:
+    def _score_category_price_simplified(self, category_score: int, expected_price: float,
+                            result_price: float, price_ranges: Tuple[Tuple[float, float], ...]) -> int:
         """
         Category + Price scoring: 100% relevant if category matches AND price in question range
-        """
-        # First check category match
-        category_score = self._score_category_simplified(expected_category, result_category, result_text)
         
+        category_score is the result's _score_category_simplified score, computed once by the caller.
+        """
         if category_score == 0:
             return 0  # Must have category relevance first
         
-        # Extract price range from question
-        price_ranges = self._extract_price_ranges_from_question(question_text)
-        
         if not price_ranges and expected_price <= 0:
             return category_score  # Return category score if no price info
         
@@ -271,14 +453,12 @@ class SimplifiedRelevanceScorer:
         
         return min(category_score, 1)
     
-    def _score_description_simplified(self, question_text: str, result_text: str) -> int:
+    def _score_description_simplified(self, question_words: FrozenSet[str], result_words: FrozenSet[str]) -> int:
         """
         Description scoring: 100% relevant if result contains key words from description
-        """
-        # Extract meaningful words from question (excluding stop words)
-        question_words = self._extract_meaningful_words(question_text)
-        result_words = self._extract_meaningful_words(result_text)
         
+        result_words are the result's meaningful words (see _extract_meaningful_words).
+        """
         if not question_words:
             return 0
         
@@ -301,11 +481,11 @@ class SimplifiedRelevanceScorer:
         return 0  # Not relevant
     
     def _parse_agentic_result(self, result: Union[Dict, str]) -> Tuple[str, float, str]:
-        """Parse agentic search result format"""
+        """Parse agentic search result format (result_text comes back lowercased)"""
         if isinstance(result, str):
             # Parse from text format
-            name_match = re.search(r'Name[:\s]*([^,\n]+)', result, re.IGNORECASE)
-            price_match = re.search(r'Price[:\s]*\$?([\d.]+)', result, re.IGNORECASE)
+            name_match = _NAME_FIELD_RE.search(result)
+            price_match = _PRICE_FIELD_RE.search(result)
             
             result_name = name_match.group(1).strip() if name_match else ""
             result_price = float(price_match.group(1)) if price_match else 0.0
@@ -313,9 +493,9 @@ class SimplifiedRelevanceScorer:
             
         elif isinstance(result, dict):
             # Parse from dict format
-            result_name = result.get('Name', result.get('DisplayName', '')).lower()
+            result_name = (result.get('Name') or result.get('DisplayName') or '').lower()
             result_price = self._extract_price_from_result(result)
-            result_text = f"{result_name} {result.get('Description', '')}".lower()
+            result_text = f"{result_name} {(result.get('Description') or '').lower()}"
         else:
             result_name = ""
             result_price = 0.0
@@ -324,116 +504,80 @@ class SimplifiedRelevanceScorer:
         return result_name, result_price, result_text
     
     def _parse_dataverse_result(self, result: Dict) -> Tuple[str, float, str]:
-        """Parse dataverse search result format"""
-        result_name = result.get('DisplayName', result.get('cr4a3_productname', '')).lower()
+        """Parse dataverse search result format (result_text comes back lowercased)"""
+        result_name = (result.get('DisplayName') or result.get('cr4a3_productname') or '').lower()
         result_price = self._extract_price_from_result(result)
-        result_description = result.get('Description', '').lower()
-        result_text = f"{result_name} {result_description}".lower()
+        result_description = (result.get('Description') or '').lower()
+        result_text = f"{result_name} {result_description}"
         
         return result_name, result_price, result_text
     
     def _extract_price_from_result(self, result: Dict) -> float:
         """Extract price from result with multiple fallback approaches"""
-        price_fields = ['Price', 'cr4a3_price', 'ListPrice', 'BasePrice']
-        
-        for field in price_fields:
-            if field in result and result[field] is not None:
+        for field in self._price_fields:
+            value = result.get(field)
+            if value is not None:
                 try:
-                    return float(result[field])
+                    return float(value)
                 except (ValueError, TypeError):
                     continue
         
         return 0.0
     
     def _extract_category_from_text(self, text: str) -> str:
-        """Extract category from text using keyword matching"""
-        text_lower = text.lower()
+        """Extract category from (already lowercased) text using keyword matching"""
+        if self._category_automaton is not None:
+            # Categories are checked in mapping order, whatever order their keywords appear in
+            hits = self._category_keyword_hits(text)
+            for category, keywords in self.category_mappings.items():
+                if not keywords.isdisjoint(hits):
+                    return category
+            return "unknown"
         
         for category, keywords in self.category_mappings.items():
             for keyword in keywords:
-                if keyword in text_lower:
+                if keyword in text:
                     return category
         
         return "unknown"
     
-    def _extract_meaningful_words(self, text: str) -> Set[str]:
-        """Extract meaningful words from text, excluding stop words"""
-        words = set()
-        clean_text = re.sub(r'[^\w\s]', ' ', text.lower())
-        
-        for word in clean_text.split():
-            if len(word) > 2 and word not in self.stop_words:
-                words.add(word)
-        
-        return words
+    def _extract_meaningful_words(self, text: str) -> FrozenSet[str]:
+        """Extract meaningful words from (already lowercased) text, excluding stop words"""
+        return _meaningful_word_set(text, self.stop_words)
     
-    def _extract_attributes_from_question(self, question_text: str) -> List[str]:
-        """Extract attribute values from question text"""
-        attributes = []
-        question_lower = question_text.lower()
-        
-        # Look for color mentions
-        for color in self.attribute_keywords['color']:
-            if color in question_lower:
-                attributes.append(color)
-        
-        # Look for size mentions
-        for size in self.attribute_keywords['size']:
-            if size in question_lower:
-                attributes.append(size)
-        
-        # Look for material mentions
-        for material in self.attribute_keywords['material']:
-            if material in question_lower:
-                attributes.append(material)
-        
-        # Look for style mentions
-        for style in self.attribute_keywords['style']:
-            if style in question_lower:
-                attributes.append(style)
-        
-        # Look for features mentions
-        for feature in self.attribute_keywords['features']:
-            if feature in question_lower:
-                attributes.append(feature)
-        
-        return attributes
+    def _classify_question_words(self, question_text: str) -> Tuple[List[str], FrozenSet[str]]:
+        """
+        Attribute values (whole words, in question order) and meaningful words of (lowercased)
+        question text, from one tokenization pass
+        """
+        attribute_words = self._attribute_words
+        stop_words = self.stop_words
+        attributes = {}  # insertion-ordered, deduplicated
+        meaningful_words = set()
+        for word in _PUNCT_RE.sub(' ', question_text).split():
+            if word in attribute_words:
+                attributes[word] = None
+            if len(word) > 2 and word not in stop_words:
+                meaningful_words.add(word)
+        return list(attributes), frozenset(meaningful_words)
     
     def _extract_price_ranges_from_question(self, question_text: str) -> List[Tuple[float, float]]:
         """Extract price ranges from question text"""
         price_ranges = []
         
-        # Pattern for explicit ranges: "$100 to $200", "$100-$200"
-        range_patterns = [
-            r'\$(\d+(?:\.\d+)?)\s*(?:to|-)\s*\$?(\d+(?:\.\d+)?)',
-            r'between\s+\$?(\d+(?:\.\d+)?)\s+and\s+\$?(\d+(?:\.\d+)?)',
-        ]
-        
-        for pattern in range_patterns:
-            matches = re.findall(pattern, question_text, re.IGNORECASE)
-            for match in matches:
-                min_price, max_price = float(match[0]), float(match[1])
-                price_ranges.append((min_price, max_price))
-        
-        # Single price with implied range: "under $50" → $0-$50
-        single_price_patterns = [
-            (r'under\s+\$?(\d+(?:\.\d+)?)', 'under'),
-            (r'less\s+than\s+\$?(\d+(?:\.\d+)?)', 'under'),
-            (r'over\s+\$?(\d+(?:\.\d+)?)', 'over'),
-            (r'more\s+than\s+\$?(\d+(?:\.\d+)?)', 'over'),
-            (r'around\s+\$?(\d+(?:\.\d+)?)', 'around'),
-            (r'\$(\d+(?:\.\d+)?)', 'exact'),
-        ]
-        
-        for pattern, price_type in single_price_patterns:
-            matches = re.findall(pattern, question_text, re.IGNORECASE)
-            for match in matches:
-                price = float(match)
-                if price_type in ['under', 'less']:
+        for match in _PRICE_PHRASE_RE.finditer(question_text):
+            kind = match.lastgroup
+            if kind == 'range_hi':
+                price_ranges.append((float(match['range_lo']), float(match['range_hi'])))
+            elif kind == 'between_hi':
+                price_ranges.append((float(match['between_lo']), float(match['between_hi'])))
+            else:
+                price = float(match[kind])
+                if kind == 'under':
                     price_ranges.append((0, price))
-                elif price_type in ['over', 'more']:
+                elif kind == 'over':
                     price_ranges.append((price, float('inf')))
-                elif price_type == 'around':
+                elif kind == 'around':
                     # Create range with ±20% tolerance
                     tolerance = price * 0.2
                     price_ranges.append((price - tolerance, price + tolerance))
@@ -444,27 +588,58 @@ class SimplifiedRelevanceScorer:
         
         return price_ranges
     
-    def _score_general_relevance(self, expected_product_name: str, expected_category: str,
-                               result_name: str, result_category: str, result_text: str) -> int:
+    def _score_general_relevance(self, expected_words: FrozenSet[str], expected_category: str,
+                               result_name: str, result_category: str, result_words: FrozenSet[str],
+                               result_text: str) -> int:
         """General fallback scoring for unknown question types"""
         name_score = 0
         category_score = 0
         
         # Check name similarity
-        if expected_product_name:
-            expected_words = set(expected_product_name.split())
-            result_words = set(result_text.split())
-            if expected_words and len(expected_words & result_words) >= len(expected_words) * 0.5:
+        if expected_words:
+            name_overlap = len(expected_words & result_words)
+            if name_overlap >= len(expected_words) * 0.5:
                 name_score = 2
-            elif len(expected_words & result_words) > 0:
+            elif name_overlap > 0:
                 name_score = 1
         
         # Check category match
         if expected_category == result_category and expected_category != "unknown":
             category_score = 2
         elif expected_category:
-            expected_keywords = self.category_mappings.get(expected_category, [expected_category])
-            if any(keyword in result_text for keyword in expected_keywords):
+            if self._count_category_keywords(expected_category, result_text) > 0:
                 category_score = 1
         
         return min(3, name_score + category_score)
+
+
+# Per-process scorer for score_queries workers, built once by the pool initializer
+_worker_scorer = None
+
+def _init_worker():
+    """Pool initializer: give the worker process its own scorer (and its own caches)"""
+    global _worker_scorer
+    _worker_scorer = SimplifiedRelevanceScorer()
+
+def _score_query(args, scorer: SimplifiedRelevanceScorer = None):
+    """Raw scores of one question's results, in result order (with the worker's scorer by default)"""
+    question_data, results, result_format = args
+    scorer = scorer or _worker_scorer
+    question_features = scorer.prepare_question(question_data)
+    return [scorer.score_result_relevance(result, question_features, result_format) for result in results]
+
+def score_queries(queries: List[Tuple[Dict, List[Any]]], result_format: str = 'dataverse',
+                  workers: int = 1, scorer: SimplifiedRelevanceScorer = None) -> List[List[int]]:
+    """
+    Raw 0-3 scores for each (question_data, results) pair, in input order
+    
+    With workers > 1 the questions are spread over that many processes (scoring is CPU-bound
+    Python, so threads would not help); otherwise they are scored in-process with scorer.
+    """
+    job_args = [(question_data, results, result_format) for question_data, results in queries]
+    if workers <= 1 or len(job_args) < 2:
+        scorer = scorer or SimplifiedRelevanceScorer()
+        return [_score_query(args, scorer) for args in job_args]
+    
+    with multiprocessing.get_context("spawn").Pool(workers, initializer=_init_worker) as pool:
+        return pool.map(_score_query, job_args, chunksize=8)
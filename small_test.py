@@ -3,14 +3,18 @@
 Small test for multi-thread agentic search
 """
 import json
+import logging
 import sys
 sys.path.append('.')
 
+from logging_utils import queued_stdout_logging
 from multi_thread_agentic_search import AgenticSearchClient, QuestionExtractor, ProgressTracker, process_single_question
 
+logger = logging.getLogger(__name__)
+
 def small_test():
     """Test with a few queries"""
-    print("🧪 Small scale test of multi-thread agentic search...")
+    logger.info("🧪 Small scale test of multi-thread agentic search...")
     
     # Initialize client
     client = AgenticSearchClient()
@@ -25,33 +29,34 @@ def small_test():
     # Initialize progress tracker
     progress_tracker = ProgressTracker(len(test_questions), "test_output")
     
-    print(f"Testing {len(test_questions)} queries...")
+    logger.info(f"Testing {len(test_questions)} queries...")
     
     for i, question_data in enumerate(test_questions):
-        print(f"\n📝 Query {i+1}: '{question_data['question']}'")
+        logger.info(f"\n📝 Query {i+1}: '{question_data['question']}'")
         
         result = process_single_question(client, question_data, progress_tracker)
         
         if result:
-            print(f"   Success: {result['success']}")
-            print(f"   Products: {result['result_count']}")
+            logger.info(f"   Success: {result['success']}")
+            logger.info(f"   Products: {result['result_count']}")
             if result['result_count'] > 0:
-                print(f"   First product: {result['extracted_products'][0]['name']}")
+                logger.info(f"   First product: {result['extracted_products'][0]['name']}")
             else:
                 response_data = result.get('response_data', {})
                 if response_data.get('Success') == False:
-                    print(f"   Error: {response_data.get('Error', 'Unknown error')}")
+                    logger.error(f"   Error: {response_data.get('Error', 'Unknown error')}")
                 else:
-                    print("   No products found but no error")
+                    logger.info("   No products found but no error")
     
-    print("\n🏁 Small test completed!")
+    logger.info("\n🏁 Small test completed!")
     
     # Show final stats
     stats = progress_tracker.get_statistics()
-    print(f"📊 Final Stats:")
-    print(f"   Success Rate: {stats['success_rate_percentage']:.1f}%")
-    print(f"   Average Response Time: {stats['average_response_time_seconds']:.2f}s")
-    print(f"   Total Results: {stats['total_results_returned']}")
+    logger.info(f"📊 Final Stats:")
+    logger.info(f"   Success Rate: {stats['success_rate_percentage']:.1f}%")
+    logger.info(f"   Average Response Time: {stats['average_response_time_seconds']:.2f}s")
+    logger.info(f"   Total Results: {stats['total_results_returned']}")
 
 if __name__ == "__main__":
-    small_test()
+    with queued_stdout_logging():
+        small_test()